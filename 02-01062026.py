@@ -1,5 +1,11 @@
+import hashlib
+import platform
+import shlex
+import shutil
 import subprocess
+import sys
 import tempfile
+import time
 import os
 import textwrap
 import plistlib
@@ -11,7 +17,14 @@ APP_PATH = f"/Applications/{APP_NAME}.app"
 AGENT_LABEL = BUNDLE_ID
 AGENT_PATH = Path.home() / "Library/LaunchAgents" / f"{AGENT_LABEL}.plist"
 
+BUILD_FLAGS = ["--windowed", "--onefile", "--name", APP_NAME]
+HIDDEN_IMPORTS = ["numpy", "matplotlib"]
+BUILD_CACHE_DIR = Path(os.environ.get("CLT_BUILD_CACHE", Path.home() / "Library/Caches" / f"{APP_NAME}-build"))
+BUILD_CACHE_MAX_BYTES = 2 * 1024**3
+BUILD_CACHE_MAX_AGE = 30 * 86400   # seconds
+
 CODE = textwrap.dedent("""
+    import argparse
     import numpy as np
     import matplotlib
     matplotlib.use("TkAgg")
@@ -19,30 +32,226 @@ CODE = textwrap.dedent("""
 
     print("hello world")
 
-    samples = [np.mean(np.random.uniform(0, 1, 30)) for _ in range(1000)]
-    plt.hist(samples, bins=30)
-    plt.title("Central Limit Theorem Demo")
-    plt.show()
+    # name: (fill a float64 array in place, population mean, population std)
+    DISTRIBUTIONS = {
+        "uniform": (lambda rng, out: rng.random(out=out), 0.5, np.sqrt(1 / 12)),
+        "exponential": (lambda rng, out: rng.standard_exponential(out=out), 1.0, 1.0),
+        "bernoulli": (lambda rng, out: np.less(rng.random(out=out), 0.3, out=out), 0.3, np.sqrt(0.3 * 0.7)),
+        "lognormal": (lambda rng, out: np.exp(rng.standard_normal(out=out), out=out),
+                      np.exp(0.5), np.sqrt((np.e - 1) * np.e)),
+    }
+
+    CHUNK_VALUES = 1 << 22   # draws per chunk, so memory stays bounded for any sample count
+    Z_RANGE = 5.0            # histogram of standardized means over [-Z_RANGE, Z_RANGE]
+
+    def sample_means_histogram(dist, sample_size, n_samples, edges, rng):
+        '''
+        Histogram of standardized means of n_samples samples of
+        sample_size draws each. Each chunk is one (rows, sample_size)
+        array reduced along axis 1, so only one chunk is in memory.
+        Returns (counts, underflow, overflow, mean, std) of the z values.
+        '''
+        fill, mu, sigma = DISTRIBUTIONS[dist]
+        scale = sigma / np.sqrt(sample_size)
+        rows = max(1, CHUNK_VALUES // sample_size)
+        buf = np.empty((rows, sample_size))
+        means = np.empty(rows)
+
+        counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        below = above = 0
+        total = total_sq = 0.0
+        done = 0
+        while done < n_samples:
+            k = min(rows, n_samples - done)
+            block = buf[:k]
+            fill(rng, block)
+            z = np.mean(block, axis=1, out=means[:k])
+            z -= mu
+            z /= scale
+
+            counts += np.histogram(z, bins=edges)[0]
+            below += int(np.count_nonzero(z < edges[0]))
+            above += int(np.count_nonzero(z > edges[-1]))
+            total += float(z.sum())
+            total_sq += float(np.dot(z, z))
+            done += k
+
+        mean = total / n_samples
+        std = np.sqrt(max(total_sq / n_samples - mean * mean, 0.0))
+        return counts, below, above, mean, std
+
+    def main():
+        ap = argparse.ArgumentParser(description="Central Limit Theorem demo")
+        ap.add_argument("--samples", type=float, default=1e6, help="sample means per panel (e.g. 1e8)")
+        ap.add_argument("--sizes", default="1,5,30", help="comma-separated sample sizes")
+        ap.add_argument("--dists", default="uniform,exponential,lognormal",
+                        help="comma-separated: " + ", ".join(DISTRIBUTIONS))
+        ap.add_argument("--bins", type=int, default=100)
+        ap.add_argument("--seed", type=int)
+        args, _ = ap.parse_known_args()
+
+        n_samples = int(args.samples)
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        dists = [d.strip() for d in args.dists.split(",") if d.strip() in DISTRIBUTIONS]
+        rng = np.random.default_rng(args.seed)
+
+        edges = np.linspace(-Z_RANGE, Z_RANGE, args.bins + 1)
+        centers = (edges[:-1] + edges[1:]) / 2
+        width = edges[1] - edges[0]
+        normal = np.exp(-centers ** 2 / 2) / np.sqrt(2 * np.pi)
+
+        fig, axes = plt.subplots(len(dists), len(sizes), squeeze=False, sharex=True,
+                                 figsize=(max(6.4, 3.2 * len(sizes)), 2.4 * len(dists) + 0.6))
+        for i, dist in enumerate(dists):
+            for j, size in enumerate(sizes):
+                counts, below, above, mean, std = sample_means_histogram(dist, size, n_samples, edges, rng)
+                ax = axes[i][j]
+                ax.bar(centers, counts / (n_samples * width), width=width)
+                ax.plot(centers, normal, color="black", linewidth=1)
+                ax.set_title(f"{dist}, n={size}", fontsize=9)
+                ax.text(0.02, 0.95, f"mean {mean:+.3f}  sd {std:.3f}", transform=ax.transAxes,
+                        fontsize=7, va="top")
+                print(f"{dist:>12} n={size:<5} {n_samples} means: z mean {mean:+.4f}, sd {std:.4f}, "
+                      f"{below + above} outside +/-{Z_RANGE:g}")
+
+        fig.suptitle(f"Central Limit Theorem Demo ({n_samples:,} sample means per panel)")
+        fig.tight_layout()
+        plt.show()
+
+    main()
 """)
 
 def run(cmd):
     subprocess.run(cmd, check=True)
 
-with tempfile.TemporaryDirectory() as d:
-    script_path = os.path.join(d, "clt_demo.py")
-
-    with open(script_path, "w") as f:
-        f.write(CODE)
-
-    run([
-        "pyinstaller",
-        "--windowed",
-        "--onefile",
-        "--name", APP_NAME,
-        "--hidden-import", "numpy",
-        "--hidden-import", "matplotlib",
-        script_path,
-    ])
+# Run under PyInstaller's interpreter: its version and the installed
+# versions of the named distributions
+BUILD_ENV_PROBE = textwrap.dedent("""
+    import json, sys
+    from importlib.metadata import PackageNotFoundError, version
+
+    def installed(name):
+        try:
+            return version(name)
+        except PackageNotFoundError:
+            return None
+
+    print(json.dumps({"python": sys.version, "packages": {n: installed(n) for n in sys.argv[1:]}}))
+""")
+
+def pyinstaller_python():
+    """
+    Command for the interpreter the `pyinstaller` script runs under, read
+    from its shebang (or pip's /bin/sh exec trampoline). Falls back to
+    this interpreter.
+    """
+    path = shutil.which("pyinstaller")
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4096).decode(errors="replace").splitlines()
+    except (TypeError, OSError):
+        head = []
+
+    argv = []
+    if head and head[0].startswith("#!"):
+        argv = shlex.split(head[0][2:])
+        if argv and os.path.basename(argv[0]) == "sh" and len(head) > 1 and head[1].startswith("'''exec' "):
+            argv = shlex.split(head[1][len("'''exec' "):])[:1]
+    if any(os.path.basename(arg).startswith("python") for arg in argv):
+        return argv
+    return [sys.executable]
+
+def build_key():
+    """
+    Hash of everything that determines the build output: the app
+    source, the PyInstaller flags and hidden imports, the PyInstaller
+    version, and the version of PyInstaller's interpreter and of each
+    hidden import installed there.
+    """
+    version = subprocess.run(
+        ["pyinstaller", "--version"], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    env = subprocess.run(
+        [*pyinstaller_python(), "-c", BUILD_ENV_PROBE, "pyinstaller", *HIDDEN_IMPORTS],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    h = hashlib.sha256()
+    for part in (CODE, *BUILD_FLAGS, *HIDDEN_IMPORTS, version, env, platform.machine()):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+def tree_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files + dirs:
+            total += os.lstat(os.path.join(root, name)).st_size
+    return total
+
+def evict_build_cache(keep):
+    """
+    Drop entries unused for BUILD_CACHE_MAX_AGE, then the least recently
+    used ones until the cache fits in BUILD_CACHE_MAX_BYTES.
+    """
+    now = time.time()
+    entries = []
+    for entry in BUILD_CACHE_DIR.iterdir():
+        if not entry.is_dir() or entry.name == keep:
+            continue
+        age = now - entry.stat().st_mtime
+        # .tmp-* are builds that died before being stored
+        if age > BUILD_CACHE_MAX_AGE or (entry.name.startswith(".tmp-") and age > 3600):
+            shutil.rmtree(entry, ignore_errors=True)
+        elif not entry.name.startswith("."):
+            entries.append((entry.stat().st_mtime, tree_size(entry), entry))
+
+    total = sum(size for _, size, _ in entries)
+    if (BUILD_CACHE_DIR / keep).is_dir():
+        total += tree_size(BUILD_CACHE_DIR / keep)
+    for _, size, entry in sorted(entries):
+        if total <= BUILD_CACHE_MAX_BYTES:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+def build_app():
+    """
+    Put a PyInstaller build of CODE at dist/<APP_NAME>.app, reusing a
+    cached build when nothing that affects it has changed.
+    """
+    key = build_key()
+    entry = BUILD_CACHE_DIR / key
+    cached_app = entry / f"{APP_NAME}.app"
+    dist_app = Path("dist") / f"{APP_NAME}.app"
+
+    if cached_app.is_dir():
+        print(f"Build cache hit ({key}), skipping PyInstaller")
+        os.utime(entry)
+        if dist_app.exists():
+            shutil.rmtree(dist_app)
+        shutil.copytree(cached_app, dist_app, symlinks=True)
+    else:
+        with tempfile.TemporaryDirectory() as d:
+            script_path = os.path.join(d, "clt_demo.py")
+
+            with open(script_path, "w") as f:
+                f.write(CODE)
+
+            hidden = [arg for name in HIDDEN_IMPORTS for arg in ("--hidden-import", name)]
+            run(["pyinstaller", *BUILD_FLAGS, *hidden, script_path])
+
+        # Copy aside and rename, so a half-written entry is never used
+        BUILD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = BUILD_CACHE_DIR / f".tmp-{key}-{os.getpid()}"
+        shutil.copytree(dist_app, tmp / dist_app.name, symlinks=True)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    evict_build_cache(keep=key)
+
+build_app()
 
 run([
     "codesign",
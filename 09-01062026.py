@@ -6,22 +6,44 @@
 # Run:
 #   ./syn_scan.py 192.168.1.1
 #
+# Queue mode (many targets, resumable):
+#   ./syn_scan.py --targets scope.txt --jobs 4 --batch-size 8
+#   ./syn_scan.py --queue nmap_syn_queue --resume
+#
 # NOTE:
 # - Requires sudo/root privileges for SYN scans (-sS)
 # - Only scan systems you own or have permission to test
 #
 
-import sys
+import argparse
+import json
+import os
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-def main():
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <target>")
-        sys.exit(1)
+DEFAULT_QUEUE_DIR = "nmap_syn_queue"
+
+def nmap_cmd(targets_file, output_base):
+    # Targets are read from a file (-iL) so an entry can never be taken
+    # as an option by the root nmap
+    return [
+        "sudo", "nmap",
+        "-sS",
+        "-Pn",
+        "-T4",
+        "-iL", str(targets_file),
+        "-oA", str(output_base)
+    ]
 
-    target = sys.argv[1]
+def write_targets_file(path, targets):
+    path.write_text("".join(f"{t}\n" for t in targets))
+    return path
+
+def scan_single(target):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     outdir = Path(f"nmap_syn_{target}_{timestamp}")
     outdir.mkdir(parents=True, exist_ok=True)
@@ -31,17 +53,9 @@ def main():
     print(f"[*] Running Nmap SYN scan (-sS) against {target}")
     print("[!] Requires sudo/root privileges")
 
-    cmd = [
-        "sudo", "nmap",
-        "-sS",
-        "-Pn",
-        "-T4",
-        target,
-        "-oA", str(output_base)
-    ]
-
     try:
-        subprocess.run(cmd, check=True)
+        targets_file = write_targets_file(outdir / "targets.txt", [target])
+        subprocess.run(nmap_cmd(targets_file, output_base), check=True)
     except subprocess.CalledProcessError as e:
         print(f"[!] Scan failed: {e}")
         sys.exit(1)
@@ -52,5 +66,158 @@ def main():
     print(f"    {output_base}.gnmap")
     print(f"    {output_base}.xml")
 
+# -----------------------------
+# Persistent job queue
+#
+# <queue>/queue.json      job list: [{"id": "job-0000", "targets": [...]}, ...]
+# <queue>/job-NNNN/targets.txt  that job's targets, passed to nmap with -iL
+# <queue>/job-NNNN/scan.* nmap -oA output for that job
+# <queue>/job-NNNN/done   written (atomically) only after nmap exits 0
+# -----------------------------
+def read_targets(path):
+    targets = []
+    for n, line in enumerate(Path(path).read_text().splitlines(), 1):
+        line = line.split("#", 1)[0]
+        for target in line.split():
+            if target.startswith("-"):
+                raise ValueError(f"{path}:{n}: {target!r} is not a target")
+            targets.append(target)
+    return targets
+
+def write_atomic(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def create_queue(queue_dir, targets, batch_size):
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [
+        {"id": f"job-{i // batch_size:04d}", "targets": targets[i:i + batch_size]}
+        for i in range(0, len(targets), batch_size)
+    ]
+    write_atomic(queue_dir / "queue.json", json.dumps({"jobs": jobs}, indent=2))
+    return jobs
+
+def load_queue(queue_dir):
+    return json.loads((queue_dir / "queue.json").read_text())["jobs"]
+
+def run_job(queue_dir, job, procs, lock, stop):
+    job_dir = queue_dir / job["id"]
+    job_dir.mkdir(exist_ok=True)
+    output_base = job_dir / "scan"
+    targets_file = write_targets_file(job_dir / "targets.txt", job["targets"])
+
+    with lock:
+        if stop.is_set():
+            return None
+        proc = subprocess.Popen(
+            nmap_cmd(targets_file, output_base),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        procs.add(proc)
+
+    _, err = proc.communicate()
+    with lock:
+        procs.discard(proc)
+
+    if proc.returncode == 0:
+        write_atomic(job_dir / "done", datetime.now().isoformat() + "\n")
+        return True
+
+    if not stop.is_set():
+        print(f"[!] {job['id']} failed ({' '.join(job['targets'])}): {err.strip()}")
+    return False
+
+def run_queue(queue_dir, jobs, concurrency):
+    done = [j for j in jobs if (queue_dir / j["id"] / "done").exists()]
+    pending = [j for j in jobs if not (queue_dir / j["id"] / "done").exists()]
+
+    print(f"[*] Queue {queue_dir}: {len(jobs)} jobs, {len(done)} already complete, {len(pending)} to run")
+    print("[!] Requires sudo/root privileges")
+    for job in done:
+        print(f"    [=] {job['id']} reused: {queue_dir / job['id'] / 'scan.xml'}")
+
+    procs = set()
+    lock = threading.Lock()
+    stop = threading.Event()
+    failed = []
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {pool.submit(run_job, queue_dir, j, procs, lock, stop): j for j in pending}
+    try:
+        for fut, job in futures.items():
+            ok = fut.result()
+            if ok:
+                print(f"    [✓] {job['id']} complete ({' '.join(job['targets'])})")
+            elif ok is False:
+                failed.append(job)
+    except KeyboardInterrupt:
+        stop.set()
+        # nmap shares our process group and gets the SIGINT too; this only
+        # covers children that ignored it
+        with lock:
+            for proc in procs:
+                try:
+                    proc.terminate()
+                except (ProcessLookupError, PermissionError):
+                    pass
+        pool.shutdown(wait=True, cancel_futures=True)
+        print(f"\n[!] Interrupted. Re-run with: {sys.argv[0]} --queue {queue_dir} --resume")
+        sys.exit(130)
+    pool.shutdown(wait=True)
+
+    if failed:
+        print(f"[!] {len(failed)} job(s) failed; re-run with --resume to retry them")
+        sys.exit(1)
+
+    print("[✓] All jobs complete")
+    print(f"[*] XML results: {queue_dir}/job-*/scan.xml")
+
+def main():
+    ap = argparse.ArgumentParser(description="Nmap SYN scan wrapper with a resumable job queue.")
+    ap.add_argument("target", nargs="?", help="Single target (original mode)")
+    ap.add_argument("--targets", help="File of in-scope targets (one or more per line, # comments)")
+    ap.add_argument("--queue", type=Path, default=Path(DEFAULT_QUEUE_DIR),
+                    help=f"Queue directory (default: {DEFAULT_QUEUE_DIR})")
+    ap.add_argument("--resume", action="store_true", help="Skip finished jobs in an existing queue")
+    ap.add_argument("--jobs", type=int, default=2, help="Concurrent nmap processes (default: 2)")
+    ap.add_argument("--batch-size", type=int, default=1, help="Targets per nmap run (default: 1)")
+    args = ap.parse_args()
+
+    if args.target and not (args.targets or args.resume):
+        if args.target.startswith("-"):
+            ap.error(f"{args.target!r} is not a target")
+        scan_single(args.target)
+        return
+
+    if args.resume:
+        if not (args.queue / "queue.json").is_file():
+            print(f"[!] No queue to resume in {args.queue}")
+            sys.exit(1)
+        jobs = load_queue(args.queue)
+    elif args.targets:
+        if (args.queue / "queue.json").exists():
+            print(f"[!] Queue already exists in {args.queue}; use --resume or choose another --queue")
+            sys.exit(1)
+        try:
+            targets = read_targets(args.targets)
+        except ValueError as e:
+            print(f"[!] {e}")
+            sys.exit(1)
+        if not targets:
+            print(f"[!] No targets in {args.targets}")
+            sys.exit(1)
+        jobs = create_queue(args.queue, targets, max(1, args.batch_size))
+    else:
+        print(f"Usage: {sys.argv[0]} <target> | --targets FILE [--jobs N] | --queue DIR --resume")
+        sys.exit(1)
+
+    run_queue(args.queue, jobs, max(1, args.jobs))
+
 if __name__ == "__main__":
     main()
@@ -3,55 +3,253 @@
 Equivalent of nmap_to_portfiles.sh
 
 Logic:
-1) Run: nmap -iL HOSTS_FILE --open
-2) When a new host appears, remember its IP
-3) For each open TCP port, append the IP to port-<port>.txt
+1) Run: nmap -iL HOSTS_FILE --open -oX -
+2) Parse the XML stream incrementally, one <host> at a time
+3) For each open TCP port, add the host's IP to port-<port>.txt
+   (deduplicated, written through a small LRU of open file handles)
+4) At the end, rewrite every port file as a sorted host list
+
+With --workers N, the hosts file is split into N balanced batches that
+are scanned by concurrent nmap processes sharing a global --max-rate.
+Only entries from the hosts file are ever passed to nmap.
 """
 
+import argparse
+import ipaddress
 import subprocess
 import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
 from pathlib import Path
 
 HOSTS_FILE = "172-16-10-hosts.txt"
+MAX_OPEN_FILES = 64
 
-def main():
-    if not Path(HOSTS_FILE).is_file():
-        print(f"[!] Hosts file not found: {HOSTS_FILE}")
-        sys.exit(1)
+def ip_sort_key(ip):
+    try:
+        addr = ipaddress.ip_address(ip)
+        return (addr.version, int(addr), ip)
+    except ValueError:
+        return (99, 0, ip)
+
+class PortFiles:
+    """
+    Appends IPs to port-<port>.txt files.
+
+    Each IP is written once per port; existing files are loaded first so
+    repeated runs merge instead of duplicating. Handles are kept open in
+    an LRU capped at MAX_OPEN_FILES instead of reopening per line.
+    """
+
+    def __init__(self, out_dir=Path("."), max_open=MAX_OPEN_FILES):
+        self.out_dir = out_dir
+        self.max_open = max_open
+        self.handles = OrderedDict()
+        self.hosts = {}
+
+    def path(self, port):
+        return self.out_dir / f"port-{port}.txt"
+
+    def add(self, port, ip):
+        seen = self.hosts.get(port)
+        if seen is None:
+            seen = self.hosts[port] = set()
+            path = self.path(port)
+            if path.is_file():
+                seen.update(line.strip() for line in path.read_text().splitlines() if line.strip())
+
+        if ip in seen:
+            return
+        seen.add(ip)
+
+        f = self.handles.get(port)
+        if f is None:
+            if len(self.handles) >= self.max_open:
+                _, oldest = self.handles.popitem(last=False)
+                oldest.close()
+            f = self.handles[port] = open(self.path(port), "a")
+        else:
+            self.handles.move_to_end(port)
+        f.write(ip + "\n")
+
+    def close(self):
+        for f in self.handles.values():
+            f.close()
+        self.handles.clear()
+
+    def finalize(self):
+        """Close handles and rewrite each port file sorted by address."""
+        self.close()
+        for port, seen in self.hosts.items():
+            self.path(port).write_text("".join(ip + "\n" for ip in sorted(seen, key=ip_sort_key)))
+
+def iter_open_ports(stream):
+    """
+    Yield (ip, port) for every open TCP port in an nmap XML stream.
+
+    Elements are cleared after each <host>, so memory stays flat no
+    matter how many hosts the scan covers.
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+        if event != "end" or elem.tag != "host":
+            continue
+
+        ip = None
+        for addr in elem.findall("address"):
+            if addr.get("addrtype") in ("ipv4", "ipv6"):
+                ip = addr.get("addr")
+                break
+
+        if ip:
+            for port in elem.iterfind("ports/port"):
+                state = port.find("state")
+                if port.get("protocol") == "tcp" and state is not None and state.get("state") == "open":
+                    yield ip, port.get("portid")
+
+        root.clear()
+
+def read_scope(hosts_file):
+    """
+    Return the target entries of an nmap -iL file (hosts, ranges, CIDRs),
+    skipping blank lines and comments.
+    """
+    entries = []
+    for line in Path(hosts_file).read_text().splitlines():
+        line = line.split("#", 1)[0]
+        entries.extend(line.split())
+    return entries
+
+def entry_weight(entry):
+    try:
+        return ipaddress.ip_network(entry, strict=False).num_addresses
+    except ValueError:
+        return 1
+
+def split_entry(entry, target):
+    """
+    Split a CIDR entry larger than `target` addresses into subnets no
+    larger than target. Subnets never leave the original network.
+    """
+    try:
+        net = ipaddress.ip_network(entry, strict=False)
+    except ValueError:
+        return [entry]
+    if net.num_addresses <= target:
+        return [entry]
+    new_prefix = net.max_prefixlen - max(0, (target.bit_length() - 1))
+    return [str(sub) for sub in net.subnets(new_prefix=max(new_prefix, net.prefixlen))]
+
+def split_batches(entries, n):
+    """
+    Split scope entries into n batches of roughly equal address count.
+    Networks bigger than a quarter of one batch's share are split into
+    subnets, then entries go largest first to the currently lightest batch.
+    """
+    share = -(-sum(entry_weight(e) for e in entries) // n)
+    pieces = [p for e in entries for p in split_entry(e, max(1, share // 4))]
+
+    batches = [[] for _ in range(n)]
+    weights = [0] * n
+    for entry in sorted(pieces, key=entry_weight, reverse=True):
+        i = weights.index(min(weights))
+        batches[i].append(entry)
+        weights[i] += entry_weight(entry)
+    return [b for b in batches if b]
+
+def run_nmap(hosts_file, port_files, lock=None, max_rate=None):
+    """
+    Run one nmap over hosts_file and feed its XML into port_files.
+    Returns (returncode, stderr text).
+    """
+    cmd = ["nmap", "-iL", str(hosts_file), "--open", "-oX", "-"]
+    if max_rate:
+        cmd += ["--max-rate", str(max_rate)]
 
-    # Run nmap and capture stdout
-    cmd = ["nmap", "-iL", HOSTS_FILE, "--open"]
     proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True
     )
 
-    current_ip = None
+    try:
+        for ip, port in iter_open_ports(proc.stdout):
+            if lock:
+                with lock:
+                    port_files.add(port, ip)
+            else:
+                port_files.add(port, ip)
+    except ET.ParseError as e:
+        print(f"[!] Could not parse nmap XML for {hosts_file}: {e}")
+        proc.kill()
+
+    proc.wait()
+    return proc.returncode, proc.stderr.read().decode(errors="replace")
 
-    # Read output line by line (same idea as `while read -r line`)
-    for line in proc.stdout:
-        line = line.strip()
+def run_parallel(hosts_file, port_files, workers, max_rate=None):
+    """
+    Scan hosts_file with up to `workers` concurrent nmap processes.
+    A global max_rate (packets/s) is divided evenly between them; nmap's
+    rate is at least 1/s per process, so there are never more processes
+    than max_rate.
+    """
+    if max_rate and workers > max_rate:
+        print(f"[*] --max-rate {max_rate} allows at most {max_rate} worker(s) at 1 packet/s each")
+        workers = max_rate
+    batches = split_batches(read_scope(hosts_file), workers)
+    per_proc_rate = max_rate // len(batches) if max_rate and batches else None
+    lock = threading.Lock()
+    results = [None] * len(batches)
 
-        # 2. Match: "Nmap scan report for <ip>"
-        if line.startswith("Nmap scan report for"):
-            current_ip = line.split("for", 1)[1].strip()
+    with tempfile.TemporaryDirectory() as d:
+        threads = []
+        for i, batch in enumerate(batches):
+            batch_file = Path(d) / f"batch-{i}.txt"
+            batch_file.write_text("\n".join(batch) + "\n")
 
-        # 3.  Match open TCP ports (e.g. "22/tcp open ssh")
-        elif "tcp" in line and "open" in line and current_ip:
-            port = line.split("/", 1)[0]
-            filename = f"port-{port}.txt"
+            def job(i=i, batch_file=batch_file):
+                results[i] = run_nmap(batch_file, port_files, lock, per_proc_rate)
 
-            # 5. Append IP to port file
-            with open(filename, "a") as f:
-                f.write(current_ip + "\n")
+            t = threading.Thread(target=job)
+            t.start()
+            threads.append(t)
 
-    proc.wait()
+        for t in threads:
+            t.join()
+
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Run nmap over a hosts file and write port-<port>.txt host lists.")
+    ap.add_argument("--hosts-file", default=HOSTS_FILE, help=f"nmap -iL target file (default: {HOSTS_FILE})")
+    ap.add_argument("--workers", type=int, default=1, help="Concurrent nmap processes (default: 1)")
+    ap.add_argument("--max-rate", type=int, default=None,
+                    help="Global packets/s cap shared by all workers (nmap --max-rate)")
+    args = ap.parse_args()
+    if args.max_rate is not None and args.max_rate < 1:
+        ap.error("--max-rate must be at least 1")
+
+    if not Path(args.hosts_file).is_file():
+        print(f"[!] Hosts file not found: {args.hosts_file}")
+        sys.exit(1)
+
+    port_files = PortFiles()
+    try:
+        if args.workers > 1:
+            results = run_parallel(args.hosts_file, port_files, args.workers, args.max_rate)
+        else:
+            results = [run_nmap(args.hosts_file, port_files, max_rate=args.max_rate)]
+    finally:
+        port_files.finalize()
 
-    if proc.returncode != 0:
-        err = proc.stderr.read()
-        print(f"[!] nmap error:\n{err}")
+    failed = [err for code, err in results if code != 0]
+    if failed:
+        print("[!] nmap error:\n" + "\n".join(failed))
         sys.exit(1)
 
     print("[✓] Port files generated")
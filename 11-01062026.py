@@ -3,14 +3,28 @@
 # Equivalent to:
 #   nc 172.16.10.11 -v 21
 #
+# Batch mode (many authorized host:port pairs, JSON lines out):
+#   ./banner_grab.py --batch targets.txt --concurrency 200 > banners.jsonl
+#
 
+import argparse
+import asyncio
+import base64
+import errno
+import json
 import socket
+import sys
+import time
 
 HOST = "172.16.10.11"
 PORT = 21
 TIMEOUT = 5  # seconds
 
-def main():
+MAX_BYTES = 4096
+IDLE_TIMEOUT = 2      # seconds without new data before the banner is considered complete
+CONCURRENCY = 100
+
+def main_single():
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.settimeout(TIMEOUT)
@@ -33,5 +47,143 @@ def main():
     except Exception as e:
         print(f"[!] Error: {e}")
 
+# -----------------------------
+# Batch mode
+# -----------------------------
+def parse_target(line):
+    """
+    Parse "host:port" or "[v6addr]:port". Returns (host, port) or None.
+    """
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    if line.startswith("["):
+        host, _, port = line[1:].partition("]:")
+    else:
+        host, _, port = line.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"expected host:port, got {line!r}")
+    if not 1 <= int(port) <= 65535:
+        raise ValueError(f"port out of range in {line!r}")
+    return host, int(port)
+
+def error_class(exc):
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, ConnectionRefusedError):
+        return "refused"
+    if isinstance(exc, ConnectionResetError):
+        return "reset"
+    if isinstance(exc, socket.gaierror):
+        return "dns"
+    if isinstance(exc, OSError) and exc.errno in (errno.EHOSTUNREACH, errno.ENETUNREACH):
+        return "unreachable"
+    return type(exc).__name__
+
+async def grab(host, port, timeout, idle_timeout, max_bytes):
+    """
+    Connect and read what the service sends unprompted. Never raises:
+    any failure is recorded in the result's "error" so one bad target
+    cannot abort the batch.
+
+    "banner" is the bytes as readable text; "banner_b64" holds them
+    exactly, for binary protocols such as telnet negotiation.
+    """
+    record = {"host": host, "port": port, "banner": None, "banner_b64": None, "bytes": 0,
+              "latency_ms": None, "error": None}
+    start = time.monotonic()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except Exception as e:
+        record["error"] = error_class(e)
+        return record
+
+    record["latency_ms"] = round((time.monotonic() - start) * 1000, 2)
+    buf = bytearray()
+    try:
+        while len(buf) < max_bytes:
+            data = await asyncio.wait_for(reader.read(max_bytes - len(buf)), idle_timeout)
+            if not data:
+                break
+            buf += data
+    except asyncio.TimeoutError:
+        # Idle: the service has said what it says unprompted
+        pass
+    except Exception as e:
+        record["error"] = error_class(e)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    record["bytes"] = len(buf)
+    record["banner"] = buf.decode("utf-8", errors="backslashreplace")
+    record["banner_b64"] = base64.b64encode(buf).decode("ascii")
+    if not buf and record["error"] is None:
+        record["error"] = "no_banner"
+    return record
+
+async def run_batch(targets, out, concurrency, timeout, idle_timeout, max_bytes):
+    """
+    Grab banners with at most `concurrency` connections open and write
+    one JSON line per target as soon as it completes.
+    """
+    targets = iter(targets)
+
+    async def worker():
+        for host, port in targets:
+            record = await grab(host, port, timeout, idle_timeout, max_bytes)
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+def read_targets(path):
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            try:
+                target = parse_target(line)
+            except ValueError as e:
+                print(f"[!] {path}:{n}: {e}", file=sys.stderr)
+                continue
+            if target:
+                yield target
+
+def main():
+    ap = argparse.ArgumentParser(description="Grab service banners (single target or batch).")
+    ap.add_argument("--batch", help="File of host:port pairs to grab banners from")
+    ap.add_argument("--out", help="Write JSON lines here instead of stdout")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                    help=f"Max simultaneous connections (default: {CONCURRENCY})")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT,
+                    help=f"Connect timeout in seconds (default: {TIMEOUT})")
+    ap.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                    help=f"Stop reading after this many idle seconds (default: {IDLE_TIMEOUT})")
+    ap.add_argument("--max-bytes", type=int, default=MAX_BYTES,
+                    help=f"Max banner bytes per target (default: {MAX_BYTES})")
+    args = ap.parse_args()
+
+    if not args.batch:
+        main_single()
+        return
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        asyncio.run(run_batch(
+            read_targets(args.batch), out, max(1, args.concurrency),
+            args.timeout, args.idle_timeout, max(1, args.max_bytes),
+        ))
+    except FileNotFoundError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n[!] Interrupted", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
 if __name__ == "__main__":
     main()
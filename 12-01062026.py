@@ -3,6 +3,8 @@
 # Equivalent to:
 #   nc 172.16.10.11 -v 21
 #
+# For many targets, use 11-01062026.py --batch (asyncio sockets, no nc).
+#
 
 import subprocess
 
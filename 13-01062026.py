@@ -2,13 +2,29 @@
 #
 # Python equivalent of curl_banner_grab.sh
 #
+# Bulk mode (non-interactive, no curl processes, JSON lines out):
+#   ./curl_banner_grab.py --targets targets.txt --workers 16 --per-host-rate 2
+#
 
+import argparse
+import http.client
+import json
+import ssl
 import subprocess
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 DEFAULT_PORT = "80"
 
-def main():
+TIMEOUT = 5           # seconds, connect and read
+WORKERS = 16
+PER_HOST_RATE = 5.0   # requests per second to any one host
+
+def main_interactive():
     # 1. Prompt for IP
     ip = input("Type a target IP address: ").strip()
 
@@ -61,5 +77,157 @@ def main():
     except Exception as e:
         print(f"[!] Error: {e}")
 
+# -----------------------------
+# Bulk mode
+# -----------------------------
+def parse_target(line):
+    """
+    Parse "host", "host:port", "[v6]:port" or a full http(s) URL into
+    (scheme, host, port, path).
+    """
+    line = line.split("#", 1)[0].strip()
+    if not line:
+        return None
+    if "://" not in line:
+        line = "http://" + line
+    parts = urlsplit(line)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"unsupported target {line!r}")
+    port = parts.port or (443 if parts.scheme == "https" else int(DEFAULT_PORT))
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return parts.scheme, parts.hostname, port, path
+
+class HostRateLimiter:
+    """Minimum spacing between requests to the same host, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def new_connection(scheme, host, port, timeout):
+    if scheme == "https":
+        # Banner grabbing: accept self-signed/internal certificates
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection(host, port, timeout=timeout, context=ctx)
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+def head_origin(origin, paths, limiter, timeout):
+    """
+    Send HEAD for every path of one origin over a single keep-alive
+    connection, reconnecting once if the server dropped it. Returns a
+    list of result records.
+    """
+    scheme, host, port = origin
+    conn = new_connection(scheme, host, port, timeout)
+    records = []
+
+    try:
+        for path in paths:
+            record = {"target": f"{scheme}://{host}:{port}{path}", "host": host, "port": port,
+                      "path": path, "status": None, "reason": None, "server": None,
+                      "headers": None, "latency_ms": None, "error": None}
+            for attempt in (1, 2):
+                limiter.wait(host)
+                start = time.monotonic()
+                try:
+                    conn.request("HEAD", path, headers={"Connection": "keep-alive"})
+                    resp = conn.getresponse()
+                    resp.read()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                    # Stale keep-alive connection: reconnect and retry once
+                    conn.close()
+                    if attempt == 2:
+                        record["error"] = type(e).__name__
+                    continue
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    record["error"] = type(e).__name__ if not str(e) else f"{type(e).__name__}: {e}"
+                    break
+
+                record.update(
+                    status=resp.status,
+                    reason=resp.reason,
+                    server=resp.getheader("Server"),
+                    headers=resp.getheaders(),
+                    latency_ms=round((time.monotonic() - start) * 1000, 2),
+                )
+                if resp.will_close:
+                    conn.close()
+                break
+            records.append(record)
+    finally:
+        conn.close()
+
+    return records
+
+def read_targets(path):
+    """Group targets by origin, keeping first-seen order."""
+    origins = OrderedDict()
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            try:
+                target = parse_target(line)
+            except ValueError as e:
+                print(f"[!] {path}:{n}: {e}", file=sys.stderr)
+                continue
+            if target:
+                scheme, host, port, req_path = target
+                origins.setdefault((scheme, host, port), []).append(req_path)
+    return origins
+
+def main_bulk(args):
+    try:
+        origins = read_targets(args.targets)
+    except FileNotFoundError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+
+    limiter = HostRateLimiter(args.per_host_rate)
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = [
+                pool.submit(head_origin, origin, paths, limiter, args.timeout)
+                for origin, paths in origins.items()
+            ]
+            for fut in futures:
+                for record in fut.result():
+                    out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Grab HTTP Server headers (interactive or bulk).")
+    ap.add_argument("--targets", help="File of host[:port] or http(s) URLs; enables bulk mode")
+    ap.add_argument("--out", help="Write JSON lines here instead of stdout")
+    ap.add_argument("--workers", type=int, default=WORKERS, help=f"Threads (default: {WORKERS})")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT,
+                    help=f"Connect/read timeout in seconds (default: {TIMEOUT})")
+    ap.add_argument("--per-host-rate", type=float, default=PER_HOST_RATE,
+                    help=f"Max requests per second per host, 0 = unlimited (default: {PER_HOST_RATE})")
+    args = ap.parse_args()
+
+    if args.targets:
+        main_bulk(args)
+    else:
+        main_interactive()
+
 if __name__ == "__main__":
     main()
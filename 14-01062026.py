@@ -5,11 +5,29 @@
 # Equivalent concept to:
 #   dirsearch -u http://172.16.10.10:8081/
 #
+# Pooled mode (large wordlists, authorized targets only):
+#   ./dirscan.py --wordlist words.txt --rps 20 --workers 8
+#   ./dirscan.py --wordlist words.txt --rps 20 --resume
+#
+# Pooled mode calibrates against a few random paths first, so catch-all
+# ("soft 404") responses are recognised from the first few KB of the body
+# and not downloaded or reported.
+#
 
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import sys
+import threading
 import requests
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
+from ratelimit import TokenBucket
+
 BASE_URL = "http://172.16.10.10:8081"
 WORDLIST = [
     "upload",
@@ -22,10 +40,21 @@ WORDLIST = [
 
 TIMEOUT = 5
 
+WORKERS = 8
+STATE_FILE = "dirscan.state"
+CHECKPOINT_SECONDS = 2
+
+CALIBRATION_PROBES = 3
+PREFIX_BYTES = 4096     # body bytes read for soft-404 fingerprints
+HASH_BYTES = 3072       # of those, hashed once echoed paths are removed
+LENGTH_BUCKET = 256     # response sizes are compared in buckets of this many bytes
+DRAIN_LIMIT = 65536     # read at most this much past the prefix to keep a connection reusable
+REPORT_STATUSES = {200, 201, 204, 301, 302, 303, 307, 308, 401, 403, 405}
+
 def now():
     return datetime.now().strftime("[%H:%M:%S]")
 
-def main():
+def main_simple():
     print(f"Target: {BASE_URL}\n")
     print(f"{now()} Starting:")
 
@@ -47,5 +76,292 @@ def main():
         # light delay to avoid hammering
         time.sleep(0.2)
 
+# -----------------------------
+# Pooled mode
+# -----------------------------
+def iter_words(path, start=0):
+    """
+    Stream (line number, word) from the wordlist, skipping the first
+    `start` lines. Blank lines and # comments keep their line numbers.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for n, line in enumerate(f):
+            if n < start:
+                continue
+            word = line.strip()
+            yield n, (word.lstrip("/") if word and not word.startswith("#") else None)
+
+_local = threading.local()
+
+def session():
+    # One keep-alive Session per worker thread; Session is not thread-safe
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+    return s
+
+class Fingerprint:
+    __slots__ = ("status", "bucket", "digest", "location")
+
+    def __init__(self, status, length, prefix, word, location):
+        # Catch-all pages often echo the requested path; take it out first
+        token = word.encode()
+        self.status = status
+        self.bucket = None if length is None else (length - prefix.count(token) * len(token)) // LENGTH_BUCKET
+        self.digest = hashlib.sha1(prefix.replace(token, b"")[:HASH_BYTES]).hexdigest()
+        self.location = location.replace(word, "{word}") if location else None
+
+class Baseline:
+    """
+    Soft-404 fingerprints from random paths. A response matches when its
+    status and normalized body prefix (or redirect target) match one of
+    them and its size is within a bucket of the calibrated size.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.locations = set()
+
+    def add(self, fp):
+        self.buckets.setdefault((fp.status, fp.digest), set()).add(fp.bucket)
+        if fp.location:
+            self.locations.add((fp.status, fp.location))
+
+    def matches(self, fp):
+        if fp.location and (fp.status, fp.location) in self.locations:
+            return True
+        buckets = self.buckets.get((fp.status, fp.digest))
+        if buckets is None:
+            return False
+        if fp.bucket is None or None in buckets:
+            return True
+        return any(abs(fp.bucket - b) <= 1 for b in buckets)
+
+    def describe(self):
+        return ", ".join(sorted({str(status) for status, _ in self.buckets}))
+
+def read_prefix(chunks):
+    prefix = b""
+    for chunk in chunks:
+        prefix += chunk
+        if len(prefix) >= PREFIX_BYTES:
+            break
+    return prefix
+
+def body_length(r, prefix):
+    header = r.headers.get("Content-Length", "")
+    if header.isdigit():
+        return int(header)
+    # A short prefix is the whole body
+    return len(prefix) if len(prefix) < PREFIX_BYTES else None
+
+def drain(chunks, remaining):
+    """
+    Read the rest of a small body so the connection goes back to the
+    pool; large bodies are left for r.close() to drop with the connection.
+    Returns (bytes read, whether the body was read to the end).
+    """
+    if remaining is not None and remaining > DRAIN_LIMIT:
+        return 0, False
+    n = 0
+    for chunk in chunks:
+        n += len(chunk)
+        if n > DRAIN_LIMIT:
+            return n, False
+    return n, True
+
+def fetch(base_url, word, limiter, timeout, baseline=None):
+    """
+    Stream one response and read only the first PREFIX_BYTES of the body,
+    enough to fingerprint it against the soft-404 baseline.
+
+    Returns (status, size or None, location, soft404, bytes read).
+    """
+    limiter.acquire()
+    r = session().get(f"{base_url}/{word}", timeout=timeout, allow_redirects=False, stream=True)
+    try:
+        location = r.headers.get("Location")
+        chunks = r.iter_content(chunk_size=PREFIX_BYTES)
+        if r.status_code not in REPORT_STATUSES:
+            header = r.headers.get("Content-Length", "")
+            read, _ = drain(chunks, int(header) if header.isdigit() else None)
+            return r.status_code, None, location, False, read
+
+        prefix = read_prefix(chunks)
+        length = body_length(r, prefix)
+        soft = baseline is not None and baseline.matches(
+            Fingerprint(r.status_code, length, prefix[:PREFIX_BYTES], word, location))
+
+        remaining = None if length is None else length - len(prefix)
+        more, complete = drain(chunks, remaining) if len(prefix) >= PREFIX_BYTES else (0, True)
+        if length is None and complete:
+            length = len(prefix) + more
+        return r.status_code, length, location, soft, len(prefix) + more
+    finally:
+        r.close()
+
+def calibrate(base_url, limiter, timeout, probes):
+    """Fingerprint the server's responses to random, nonexistent paths."""
+    baseline = Baseline()
+    for _ in range(probes):
+        word = secrets.token_hex(8)
+        limiter.acquire()
+        r = session().get(f"{base_url}/{word}", timeout=timeout, allow_redirects=False, stream=True)
+        try:
+            prefix = read_prefix(r.iter_content(chunk_size=PREFIX_BYTES))
+            baseline.add(Fingerprint(r.status_code, body_length(r, prefix), prefix[:PREFIX_BYTES],
+                                     word, r.headers.get("Location")))
+        finally:
+            r.close()
+    return baseline
+
+def load_state(path, base_url, wordlist):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return 0
+    if state.get("url") != base_url or state.get("wordlist") != os.path.abspath(wordlist):
+        raise ValueError(f"{path} belongs to a different run ({state.get('url')}, {state.get('wordlist')})")
+    return state["offset"]
+
+def save_state(path, base_url, wordlist, offset):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"url": base_url, "wordlist": os.path.abspath(wordlist), "offset": offset}, f)
+    os.replace(tmp, path)
+
+def run_pooled(base_url, wordlist, rps, workers, timeout, state_path, start, probes=CALIBRATION_PROBES):
+    """
+    Probe every word with `workers` threads behind one token bucket.
+    Responses matching the soft-404 baseline from `probes` random paths
+    are counted but not reported.
+
+    Words finish out of order, so the checkpoint is the first line not
+    yet finished: every line before it is done. An interrupted run
+    resumes from there and repeats at most the words that were in flight.
+    """
+    limiter = TokenBucket(rps)
+    baseline = None
+    if probes:
+        baseline = calibrate(base_url, limiter, timeout, probes)
+        print(f"{now()} Soft-404 baseline: status {baseline.describe()} from {probes} random path(s)")
+
+    words = iter_words(wordlist, start)
+    in_flight = {}
+    finished = set()
+    offset = start
+    last_save = time.monotonic()
+    requests_sent = errors = soft = bytes_read = 0
+
+    def advance():
+        nonlocal offset
+        while offset in finished:
+            finished.discard(offset)
+            offset += 1
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            # Keep a bounded number of words queued ahead of the workers
+            while len(in_flight) < workers * 2:
+                item = next(words, None)
+                if item is None:
+                    break
+                n, word = item
+                if word is None:
+                    finished.add(n)
+                    continue
+                in_flight[pool.submit(fetch, base_url, word, limiter, timeout, baseline)] = (n, word)
+            advance()
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n, word = in_flight.pop(fut)
+                finished.add(n)
+                requests_sent += 1
+                try:
+                    status, size, location, is_soft, read = fut.result()
+                except requests.exceptions.RequestException:
+                    errors += 1
+                    continue
+                bytes_read += read
+                if is_soft:
+                    soft += 1
+                elif status in REPORT_STATUSES:
+                    size = f"{size:>5}B" if size is not None else "    ?B"
+                    target = f"  -> {location}" if location else ""
+                    print(f"{now()} {status} - {size}  - /{word}{target}", flush=True)
+
+            advance()
+            if time.monotonic() - last_save >= CHECKPOINT_SECONDS:
+                save_state(state_path, base_url, wordlist, offset)
+                last_save = time.monotonic()
+    except KeyboardInterrupt:
+        for fut in in_flight:
+            fut.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+        advance()
+        save_state(state_path, base_url, wordlist, offset)
+        print(f"\n{now()} Interrupted at line {offset}. Re-run with --resume to continue.")
+        sys.exit(130)
+    pool.shutdown(wait=True)
+
+    save_state(state_path, base_url, wordlist, offset)
+    print(f"\n{now()} Done: {requests_sent} requests, {errors} errors, {soft} soft-404, "
+          f"{bytes_read / 1024:.0f} KB of bodies read, {offset} lines")
+
+def main():
+    ap = argparse.ArgumentParser(description="Directory brute-force (built-in list or pooled wordlist mode).")
+    ap.add_argument("--url", default=BASE_URL, help=f"Base URL (default: {BASE_URL})")
+    ap.add_argument("--wordlist", help="Stream words from this file (pooled mode)")
+    ap.add_argument("--rps", type=float, help="Max requests per second (required with --wordlist)")
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help=f"Concurrent keep-alive connections (default: {WORKERS})")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT,
+                    help=f"Request timeout in seconds (default: {TIMEOUT})")
+    ap.add_argument("--state", default=STATE_FILE,
+                    help=f"Resume checkpoint file (default: {STATE_FILE})")
+    ap.add_argument("--resume", action="store_true", help="Continue from the checkpoint in --state")
+    ap.add_argument("--calibrate", type=int, default=CALIBRATION_PROBES,
+                    help=f"Random paths used to fingerprint soft 404s, 0 = off (default: {CALIBRATION_PROBES})")
+    args = ap.parse_args()
+
+    if not args.wordlist:
+        main_simple()
+        return
+
+    if not args.rps or args.rps <= 0:
+        ap.error("--wordlist needs an explicit --rps")
+
+    base_url = args.url.rstrip("/")
+    start = 0
+    if args.resume:
+        try:
+            start = load_state(args.state, base_url, args.wordlist)
+        except ValueError as e:
+            print(f"[!] {e}")
+            sys.exit(1)
+    elif os.path.exists(args.state):
+        print(f"[!] {args.state} exists; use --resume or choose another --state")
+        sys.exit(1)
+
+    print(f"Target: {base_url}\n")
+    print(f"{now()} Starting: {args.wordlist} from line {start}, {args.rps:g} req/s, {args.workers} workers")
+    try:
+        run_pooled(base_url, args.wordlist, args.rps, max(1, args.workers),
+                   args.timeout, args.state, start, max(0, args.calibrate))
+    except FileNotFoundError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    except requests.exceptions.RequestException as e:
+        print(f"[!] Calibration failed: {e}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
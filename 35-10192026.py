@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+"""
+Byte-range file sharding engine.
+
+Splits a file into byte ranges instead of lines (26) or read() chunks (30):
+- Shard boundaries are found with mmap, optionally snapped to the next newline
+- Ranges are copied with os.copy_file_range / os.sendfile, so shard data
+  never passes through Python objects
+- A manifest records the offset and size of every shard
+- Optional content-defined chunking (FastCDC-style gear hash) into a
+  deduplicating, content-addressed chunk store
+- Parallel verify-and-reassemble: shards are ordered by manifest index and
+  hashed and pwrite()n at their offsets from a thread pool
+- Optional per-shard compression (zlib/lzma/bz2) in a process pool, with
+  parallel decompression on reassembly
+
+Usage:
+  python3 shard_engine.py shard big.log shards/ --shard-size 64M --snap-newlines
+  python3 shard_engine.py shard big.log shards/ --compress lzma --workers 8
+  python3 shard_engine.py cdc backup.img store/ --avg-size 1M
+  python3 shard_engine.py reassemble shards/manifest.json recovered.log --workers 8
+"""
+
+from __future__ import annotations
+import argparse
+import bz2
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    # Content-defined chunking falls back to a per-byte loop (~6 MB/s)
+    np = None
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024  # 64 MB
+COPY_CHUNK = 1 << 30                   # max bytes per copy syscall
+IO_CHUNK = 8 * 1024 * 1024             # hash/pwrite granularity on reassembly
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+MANIFEST_NAME = "manifest.json"
+
+DEFAULT_CDC_AVG = 1024 * 1024          # 1 MB average chunk
+CDC_MASK64 = (1 << 64) - 1
+CDC_WINDOW = 64                        # bytes that still affect the gear hash
+CDC_BLOCK = 64 * 1024                  # window hashes computed at once (fits in cache)
+
+# Gear table for the rolling hash. Derived from SHA-256 rather than a PRNG so
+# chunk boundaries (and therefore dedup) stay stable across Python versions.
+GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "big")
+    for i in range(256)
+]
+
+# codec -> (shard suffix, compressor factory taking a level, decompressor factory)
+CODECS = {
+    "zlib": (".zz", lambda level: zlib.compressobj(-1 if level is None else level), zlib.decompressobj),
+    "lzma": (".xz", lambda level: lzma.LZMACompressor(preset=level), lzma.LZMADecompressor),
+    "bz2": (".bz2", lambda level: bz2.BZ2Compressor(9 if level is None else level), bz2.BZ2Decompressor),
+}
+
+SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse sizes like '4096', '512K', '64M', '2G'.
+    """
+    text = text.strip().upper().rstrip("B")
+    mult = SIZE_SUFFIXES.get(text[-1:], 1)
+    if mult != 1:
+        text = text[:-1]
+    try:
+        size = int(float(text) * mult)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    if size <= 0:
+        raise argparse.ArgumentTypeError("size must be positive")
+    return size
+
+
+def find_boundaries(
+    src: Path,
+    shard_size: int,
+    snap_newlines: bool = False,
+) -> list[tuple[int, int]]:
+    """
+    Return (offset, size) ranges covering the whole file.
+
+    With snap_newlines, each cut is moved forward to just after the next
+    b"\\n" so no line is split across shards. A single line longer than
+    shard_size then becomes one oversized shard.
+    """
+    total = src.stat().st_size
+    if total == 0:
+        return []
+    if not snap_newlines:
+        return [(off, min(shard_size, total - off)) for off in range(0, total, shard_size)]
+
+    ranges = []
+    with src.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < total:
+            cut = start + shard_size
+            if cut >= total:
+                cut = total
+            else:
+                nl = mm.find(b"\n", cut - 1)
+                cut = total if nl == -1 else nl + 1
+            ranges.append((start, cut - start))
+            start = cut
+
+    return ranges
+
+
+def copy_range(
+    src_fd: int, dst_fd: int, offset: int, size: int, dst_offset: int = 0, shared: bool = False
+) -> None:
+    """
+    Copy `size` bytes at `offset` in src_fd to `dst_offset` in dst_fd.
+
+    Prefers copy_file_range (in-kernel, reflinks on CoW filesystems), then
+    sendfile, then a plain pread/pwrite loop if neither is supported.
+    sendfile writes at dst_fd's file position, so it is skipped when
+    `shared` is set: other threads writing through the same descriptor
+    would move that position under it. The other two take explicit
+    offsets and are safe to run concurrently.
+    """
+    end = offset + size
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < end:
+                n = os.copy_file_range(
+                    src_fd, dst_fd, min(end - offset, COPY_CHUNK), offset, dst_offset
+                )
+                if n == 0:
+                    raise EOFError(f"source ended before offset {end}")
+                offset += n
+                dst_offset += n
+            return
+        except OSError:
+            # EXDEV/ENOSYS/EINVAL on older kernels or across filesystems
+            pass
+
+    if hasattr(os, "sendfile") and not shared:
+        try:
+            os.lseek(dst_fd, dst_offset, os.SEEK_SET)
+            while offset < end:
+                n = os.sendfile(dst_fd, src_fd, offset, min(end - offset, COPY_CHUNK))
+                if n == 0:
+                    raise EOFError(f"source ended before offset {end}")
+                offset += n
+                dst_offset += n
+            return
+        except OSError:
+            pass
+
+    while offset < end:
+        data = os.pread(src_fd, min(end - offset, 1 << 20), offset)
+        if not data:
+            raise EOFError(f"source ended before offset {end}")
+        os.pwrite(dst_fd, data, dst_offset)
+        offset += len(data)
+        dst_offset += len(data)
+
+
+def hash_range(mm: mmap.mmap, offset: int, size: int) -> str:
+    """
+    SHA-256 of a byte range, fed to hashlib straight from the mapping.
+    """
+    h = hashlib.sha256()
+    view = memoryview(mm)
+    try:
+        for pos in range(offset, offset + size, 1 << 20):
+            h.update(view[pos:min(pos + (1 << 20), offset + size)])
+    finally:
+        view.release()
+    return h.hexdigest()
+
+
+def shard_name(src: Path, index: int) -> str:
+    return f"{src.name}.part{index:06d}"
+
+
+def compress_range(src: Path, offset: int, size: int, dst: Path, codec: str, level: int | None) -> dict:
+    """
+    Read a byte range of src, compress it into dst and return the hashes and
+    sizes of both forms. Runs in a worker process; each worker reads its own
+    range, so the pool scales with cores instead of one reader.
+    """
+    _, make_compressor, _ = CODECS[codec]
+    comp = make_compressor(level)
+    raw_hash = hashlib.sha256()
+    stored_hash = hashlib.sha256()
+    stored_size = 0
+
+    with src.open("rb") as f, dst.open("wb") as out:
+        pos, end = offset, offset + size
+        while pos < end:
+            data = os.pread(f.fileno(), min(IO_CHUNK, end - pos), pos)
+            if not data:
+                raise EOFError(f"source ended before offset {end}")
+            raw_hash.update(data)
+            pos += len(data)
+            block = comp.compress(data)
+            if block:
+                stored_hash.update(block)
+                stored_size += len(block)
+                out.write(block)
+        block = comp.flush()
+        stored_hash.update(block)
+        stored_size += len(block)
+        out.write(block)
+
+    return {
+        "sha256": raw_hash.hexdigest(),
+        "codec": codec,
+        "stored_size": stored_size,
+        "stored_sha256": stored_hash.hexdigest(),
+    }
+
+
+def compress_ranges(
+    src: Path,
+    out_dir: Path,
+    ranges: list[tuple[int, int]],
+    codec: str,
+    level: int | None,
+    workers: int,
+) -> list[dict]:
+    """
+    Compress every range in a process pool, keeping at most 2 * workers
+    shards in flight so memory stays bounded while workers read ahead.
+    Returns manifest entries in index order.
+    """
+    suffix = CODECS[codec][0]
+    entries = []
+    in_flight = deque()
+
+    def collect():
+        entry, fut = in_flight.popleft()
+        entry.update(fut.result())
+        entries.append(entry)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for index, (offset, size) in enumerate(ranges):
+            name = shard_name(src, index) + suffix
+            entry = {"index": index, "name": name, "offset": offset, "size": size}
+            fut = pool.submit(compress_range, src, offset, size, out_dir / name, codec, level)
+            in_flight.append((entry, fut))
+            if len(in_flight) >= 2 * workers:
+                collect()
+        while in_flight:
+            collect()
+
+    return entries
+
+
+def shard_byte_ranges(
+    src: Path,
+    out_dir: Path,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    snap_newlines: bool = False,
+    with_hashes: bool = False,
+    codec: str | None = None,
+    level: int | None = None,
+    workers: int = DEFAULT_WORKERS,
+) -> dict:
+    """
+    Split src into byte-range shards in out_dir and write manifest.json.
+    With a codec, shards are compressed in a process pool and hashes are
+    always recorded. Returns the manifest.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ranges = find_boundaries(src, shard_size, snap_newlines)
+
+    manifest = {
+        "file": src.name,
+        "size": src.stat().st_size,
+        "shard_size": shard_size,
+        "snap_newlines": snap_newlines,
+        "shards": [],
+    }
+
+    if codec:
+        manifest["codec"] = codec
+        manifest["shards"] = compress_ranges(src, out_dir, ranges, codec, level, workers)
+        (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+    with src.open("rb") as f:
+        mm = None
+        if with_hashes and ranges:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for index, (offset, size) in enumerate(ranges):
+                name = shard_name(src, index)
+                dst_fd = os.open(out_dir / name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    copy_range(f.fileno(), dst_fd, offset, size)
+                finally:
+                    os.close(dst_fd)
+
+                entry = {"index": index, "name": name, "offset": offset, "size": size}
+                if mm is not None:
+                    entry["sha256"] = hash_range(mm, offset, size)
+                manifest["shards"].append(entry)
+        finally:
+            if mm is not None:
+                mm.close()
+
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def cdc_masks(avg_size: int) -> tuple[int, int]:
+    """
+    FastCDC normalized-chunking masks for an average chunk of ~avg_size.
+
+    Before the average size a harder mask (one extra bit) is used, after it
+    an easier one, which tightens the chunk size distribution. High bits are
+    used because they depend on the last 64 bytes of the gear hash.
+    """
+    bits = max(1, avg_size.bit_length() - 1)
+    hard = ((1 << (bits + 1)) - 1) << (64 - bits - 1)
+    easy = ((1 << max(1, bits - 1)) - 1) << (64 - max(1, bits - 1))
+    return hard, easy
+
+
+def cdc_cut(view, start: int, end: int, min_size: int, avg_size: int, masks: tuple[int, int]) -> int:
+    """
+    Return the end offset of the chunk starting at `start`.
+
+    `end` is already capped at start + max_size. The first min_size bytes
+    are skipped without hashing (FastCDC cut-point skipping).
+    """
+    i = start + min_size
+    if i >= end:
+        return end
+
+    hard, easy = masks
+    gear = GEAR
+    mask64 = CDC_MASK64
+    normal = min(start + avg_size, end)
+    h = 0
+
+    while i < normal:
+        h = ((h << 1) + gear[view[i]]) & mask64
+        if not h & hard:
+            return i + 1
+        i += 1
+
+    while i < end:
+        h = ((h << 1) + gear[view[i]]) & mask64
+        if not h & easy:
+            return i + 1
+        i += 1
+
+    return end
+
+
+class GearWindows:
+    """
+    Gear hashes of every 64-byte window of a buffer, computed with numpy a
+    block at a time.
+
+    The hash shifts left once per byte, so a byte's contribution is gone
+    after CDC_WINDOW bytes and the hash at position i depends only on
+    bytes i-63..i, whatever happened earlier. Window hashes are built by
+    doubling (1, 2, 4 ... 64 bytes), six vector passes per block instead
+    of one Python step per byte.
+    """
+
+    def __init__(self, view):
+        self.data = np.frombuffer(view, dtype=np.uint8)
+        self.gear = np.array(GEAR, dtype=np.uint64)
+        self.buf = np.empty(CDC_BLOCK + CDC_WINDOW, dtype=np.uint64)
+        self.tmp = np.empty_like(self.buf)
+        self.lo = self.hi = 0
+        self.hashes = None
+
+    def block(self, pos: int):
+        """Return (first position, hashes) of a block containing pos."""
+        if not self.lo <= pos < self.hi:
+            lo0 = max(0, pos - CDC_WINDOW + 1)
+            self.lo, self.hi = pos, min(pos + CDC_BLOCK, len(self.data))
+            n = self.hi - lo0
+            h, tmp = self.buf[:n], self.tmp
+            np.take(self.gear, self.data[lo0:self.hi], out=h)
+            span = 1
+            while span < CDC_WINDOW:
+                # h[i] += h[i - span] << span, read before any of it is updated
+                np.left_shift(h[:-span], np.uint64(span), out=tmp[:n - span])
+                np.add(h[span:], tmp[:n - span], out=h[span:])
+                span *= 2
+            self.hashes = h[pos - lo0:]
+        return self.lo, self.hashes
+
+    def first_cut(self, start: int, end: int, mask: int) -> int | None:
+        """First position in [start, end) whose window hash has no bit of mask set."""
+        mask = np.uint64(mask)
+        pos = start
+        while pos < end:
+            lo, hashes = self.block(pos)
+            stop = min(end, lo + len(hashes))
+            hits = np.flatnonzero((hashes[pos - lo:stop - lo] & mask) == 0)
+            if len(hits):
+                return pos + int(hits[0])
+            pos = stop
+        return None
+
+
+def cdc_cut_vectorized(view, windows: GearWindows, start: int, end: int, min_size: int,
+                       avg_size: int, masks: tuple[int, int]) -> int:
+    """
+    Same cut point as cdc_cut(). The first 63 hashed bytes still depend
+    on where hashing started, so they are stepped through as in cdc_cut();
+    after that the precomputed window hashes are searched.
+    """
+    i = start + min_size
+    if i >= end:
+        return end
+
+    hard, easy = masks
+    gear = GEAR
+    mask64 = CDC_MASK64
+    normal = min(start + avg_size, end)
+    h = 0
+
+    for i in range(i, min(i + CDC_WINDOW - 1, end)):
+        h = ((h << 1) + gear[view[i]]) & mask64
+        if not h & (hard if i < normal else easy):
+            return i + 1
+    i += 1
+
+    if i < normal:
+        cut = windows.first_cut(i, normal, hard)
+        if cut is not None:
+            return cut + 1
+    cut = windows.first_cut(max(i, normal), end, easy)
+    return end if cut is None else cut + 1
+
+
+def cdc_ranges(mm: mmap.mmap, avg_size: int = DEFAULT_CDC_AVG) -> list[tuple[int, int]]:
+    """
+    Split a mapping into content-defined (offset, size) ranges with
+    min = avg / 4 and max = avg * 8.
+
+    With numpy the boundary search is vectorized (~150 MB/s);
+    without it cdc_cut() hashes byte by byte at a few MB/s. Both find
+    the same boundaries.
+    """
+    total = len(mm)
+    min_size = max(64, avg_size // 4)
+    max_size = avg_size * 8
+    masks = cdc_masks(avg_size)
+
+    ranges = []
+    view = memoryview(mm)
+    windows = GearWindows(view) if np is not None else None
+    try:
+        start = 0
+        while start < total:
+            end = min(start + max_size, total)
+            if windows is not None:
+                cut = cdc_cut_vectorized(view, windows, start, end, min_size, avg_size, masks)
+            else:
+                cut = cdc_cut(view, start, end, min_size, avg_size, masks)
+            ranges.append((start, cut - start))
+            start = cut
+    finally:
+        if windows is not None:
+            # numpy holds an export of the view until its arrays are gone
+            del windows
+        view.release()
+
+    return ranges
+
+
+def chunk_path(store_dir: Path, digest: str) -> Path:
+    return store_dir / "chunks" / digest[:2] / digest
+
+
+def shard_content_defined(
+    src: Path,
+    store_dir: Path,
+    avg_size: int = DEFAULT_CDC_AVG,
+    manifest_path: Path | None = None,
+) -> dict:
+    """
+    Chunk src with content-defined boundaries into a content-addressed store.
+
+    Chunks live at store_dir/chunks/<aa>/<sha256> and are written only if
+    not already present, so a re-run after a small edit writes only the
+    chunks around the edit. Returns the manifest, which is written to
+    store_dir/<src name>.manifest.json unless manifest_path is given.
+    """
+    store_dir.mkdir(parents=True, exist_ok=True)
+    if manifest_path is None:
+        manifest_path = store_dir / f"{src.name}.manifest.json"
+
+    manifest = {
+        "file": src.name,
+        "size": src.stat().st_size,
+        "mode": "cdc",
+        "avg_size": avg_size,
+        "shards": [],
+    }
+    stats = {"chunks": 0, "new_chunks": 0, "new_bytes": 0}
+
+    if manifest["size"] == 0:
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+        manifest["stats"] = stats
+        return manifest
+
+    with src.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for index, (offset, size) in enumerate(cdc_ranges(mm, avg_size)):
+            digest = hash_range(mm, offset, size)
+            path = chunk_path(store_dir, digest)
+
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{digest}.tmp{os.getpid()}")
+                dst_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    copy_range(f.fileno(), dst_fd, offset, size)
+                finally:
+                    os.close(dst_fd)
+                os.replace(tmp, path)
+                stats["new_chunks"] += 1
+                stats["new_bytes"] += size
+
+            stats["chunks"] += 1
+            manifest["shards"].append({
+                "index": index,
+                "name": os.path.relpath(path, manifest_path.parent),
+                "offset": offset,
+                "size": size,
+                "sha256": digest,
+            })
+
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    manifest["stats"] = stats
+    return manifest
+
+
+def load_manifest(path: Path) -> tuple[dict, Path]:
+    """
+    Load a manifest file, or <dir>/manifest.json if given a directory.
+    Returns the manifest and the directory shard names are relative to.
+    """
+    if path.is_dir():
+        path = path / MANIFEST_NAME
+    return json.loads(path.read_text()), path.parent
+
+
+def plan_reassembly(manifest: dict) -> list[dict]:
+    """
+    Order shard entries by manifest index (not by file name) and fill in
+    output offsets for manifests that only record sizes, such as those
+    written by shard_file_with_hashes().
+    """
+    entries = sorted(
+        enumerate(manifest["shards"]),
+        key=lambda item: item[1].get("index", item[0]),
+    )
+
+    plan = []
+    offset = 0
+    for _, entry in entries:
+        entry = dict(entry)
+        entry.setdefault("offset", offset)
+        offset = entry["offset"] + entry["size"]
+        plan.append(entry)
+    return plan
+
+
+def restore_shard(entry: dict, shard_dir: Path, out_fd: int) -> None:
+    """
+    Verify one shard and write it at its offset in the output.
+
+    The shard is mapped and fed to hashlib and os.pwrite in IO_CHUNK
+    slices; both release the GIL, so workers hash and write concurrently.
+    Shards without a sha256 are copied in-kernel with copy_range().
+    """
+    path = shard_dir / entry["name"]
+    size = entry["size"]
+
+    with path.open("rb") as f:
+        actual = os.fstat(f.fileno()).st_size
+        if actual != size:
+            raise ValueError(f"size mismatch ({actual} != {size})")
+
+        if "sha256" not in entry:
+            copy_range(f.fileno(), out_fd, 0, size, entry["offset"], shared=True)
+            return
+        if size == 0:
+            digest = hashlib.sha256().hexdigest()
+        else:
+            h = hashlib.sha256()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for pos in range(0, size, IO_CHUNK):
+                        piece = view[pos:pos + IO_CHUNK]
+                        h.update(piece)
+                        written = 0
+                        while written < len(piece):
+                            written += os.pwrite(out_fd, piece[written:], entry["offset"] + pos + written)
+                        piece.release()
+                finally:
+                    view.release()
+            digest = h.hexdigest()
+
+    if digest != entry["sha256"]:
+        raise ValueError("integrity check failed")
+
+
+def restore_compressed_shard(entry: dict, shard_dir: Path, output_path: Path) -> None:
+    """
+    Verify, decompress and pwrite one compressed shard. Runs in a worker
+    process, which opens the preallocated output itself.
+    """
+    _, _, make_decompressor = CODECS[entry["codec"]]
+    decomp = make_decompressor()
+    stored_hash = hashlib.sha256()
+    raw_hash = hashlib.sha256()
+    raw_size = 0
+
+    out_fd = os.open(output_path, os.O_WRONLY)
+    try:
+        with (shard_dir / entry["name"]).open("rb") as f:
+            while True:
+                block = f.read(IO_CHUNK)
+                if not block:
+                    break
+                stored_hash.update(block)
+                data = decomp.decompress(block)
+                if raw_size + len(data) > entry["size"]:
+                    raise ValueError("decompressed data exceeds recorded size")
+                raw_hash.update(data)
+                os.pwrite(out_fd, data, entry["offset"] + raw_size)
+                raw_size += len(data)
+        if not decomp.eof:
+            raise ValueError("truncated compressed shard")
+    except (EOFError, zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"corrupt compressed shard ({e})") from e
+    finally:
+        os.close(out_fd)
+
+    if stored_hash.hexdigest() != entry["stored_sha256"]:
+        raise ValueError("integrity check failed (compressed)")
+    if raw_size != entry["size"] or raw_hash.hexdigest() != entry["sha256"]:
+        raise ValueError("integrity check failed")
+
+
+def parallel_reassemble(manifest_path: Path, output_path: Path, workers: int = DEFAULT_WORKERS) -> int:
+    """
+    Verify and reassemble shards from a manifest using a thread pool.
+
+    The output is preallocated and written as <output>.partial, then
+    renamed into place only if every shard verified. Compressed shards
+    are decompressed in a process pool instead. Raises ValueError
+    listing all failed shards otherwise. Returns the number of bytes.
+    """
+    manifest, shard_dir = load_manifest(manifest_path)
+    plan = plan_reassembly(manifest)
+    total = manifest.get("size", sum(e["size"] for e in plan))
+
+    partial = output_path.with_name(output_path.name + ".partial")
+    out_fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if total:
+            try:
+                os.posix_fallocate(out_fd, 0, total)
+            except (AttributeError, OSError):
+                os.ftruncate(out_fd, total)
+
+        errors = []
+        if manifest.get("codec"):
+            pool = ProcessPoolExecutor(max_workers=workers)
+            submit = lambda e: pool.submit(restore_compressed_shard, e, shard_dir, partial)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+            submit = lambda e: pool.submit(restore_shard, e, shard_dir, out_fd)
+        with pool:
+            futures = [(e, submit(e)) for e in plan]
+            for entry, fut in futures:
+                try:
+                    fut.result()
+                except (OSError, ValueError) as e:
+                    errors.append(f"{entry['name']}: {e}")
+    finally:
+        os.close(out_fd)
+
+    if errors:
+        partial.unlink(missing_ok=True)
+        raise ValueError("Reassembly failed:\n  " + "\n  ".join(errors))
+
+    os.replace(partial, output_path)
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Byte-range file sharding with zero-copy I/O.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sp = sub.add_parser("shard", help="Split a file into byte-range shards")
+    sp.add_argument("src", type=Path, help="File to shard")
+    sp.add_argument("out_dir", type=Path, help="Directory for shards and manifest.json")
+    sp.add_argument("--shard-size", type=parse_size, default=DEFAULT_SHARD_SIZE,
+                    help="Target shard size, e.g. 512K, 64M, 1G (default: 64M)")
+    sp.add_argument("--snap-newlines", action="store_true",
+                    help="Move each cut forward to the next newline")
+    sp.add_argument("--hash", dest="with_hashes", action="store_true",
+                    help="Record a SHA-256 per shard in the manifest")
+    sp.add_argument("--compress", choices=sorted(CODECS), default=None,
+                    help="Compress shards in a process pool")
+    sp.add_argument("--level", type=int, default=None,
+                    help="Compression level/preset (default: codec default)")
+    sp.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help=f"Compression worker processes (default: {DEFAULT_WORKERS})")
+
+    cp = sub.add_parser("cdc", help="Content-defined chunking into a deduplicating chunk store")
+    cp.add_argument("src", type=Path, help="File to chunk")
+    cp.add_argument("store_dir", type=Path, help="Content-addressed chunk store")
+    cp.add_argument("--avg-size", type=parse_size, default=DEFAULT_CDC_AVG,
+                    help="Average chunk size, e.g. 256K, 1M (default: 1M). Boundary search "
+                         "runs at ~150 MB/s with numpy, ~6 MB/s without it")
+    cp.add_argument("--manifest", type=Path, default=None,
+                    help="Manifest path (default: <store_dir>/<file>.manifest.json)")
+
+    rp = sub.add_parser("reassemble", help="Verify shards and reassemble them in parallel")
+    rp.add_argument("manifest", type=Path, help="Manifest file or shard directory containing manifest.json")
+    rp.add_argument("output", type=Path, help="Reassembled output file")
+    rp.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help=f"Concurrent shard workers (default: {DEFAULT_WORKERS})")
+
+    args = ap.parse_args()
+
+    if args.command == "shard":
+        if not args.src.is_file():
+            raise SystemExit(f"Source file not found: {args.src}")
+        manifest = shard_byte_ranges(
+            args.src, args.out_dir, args.shard_size, args.snap_newlines, args.with_hashes,
+            args.compress, args.level, max(1, args.workers),
+        )
+        print(f"Created {len(manifest['shards'])} shards in {args.out_dir}")
+
+    elif args.command == "cdc":
+        if not args.src.is_file():
+            raise SystemExit(f"Source file not found: {args.src}")
+        manifest = shard_content_defined(args.src, args.store_dir, args.avg_size, args.manifest)
+        stats = manifest["stats"]
+        print(
+            f"{stats['chunks']} chunks, {stats['new_chunks']} new "
+            f"({stats['new_bytes']} bytes written) in {args.store_dir}"
+        )
+
+    elif args.command == "reassemble":
+        try:
+            total = parallel_reassemble(args.manifest, args.output, max(1, args.workers))
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Reassembled {total} bytes into {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for file sharding, verification and reassembly.
+
+Compares on equal terms:
+- 26: shard_file (line-based) and reassemble
+- 30: shard_file_with_hashes and verify_and_reassemble (loaded from the guide)
+- 35: byte-range shard (plain, hashed, compressed) and parallel reassemble
+
+Test files are generated as sparse (all holes) and random, from 1 MB up to
+50 GB. Every case runs in a fresh child process, which reports wall time,
+read/write syscalls and bytes from /proc/self/io, and peak RSS. Results are
+written as JSON so runs can be compared between versions.
+
+The syscall columns do not show the data 35 moves in the kernel:
+copy_file_range and sendfile copy whole ranges per call and mmap reads
+make no call at all, so those two calls are counted separately
+(copy_file_range_calls, sendfile_calls) in the child process.
+
+Every reassembled output is hashed against its source after the case.
+A mismatch is recorded as "verified": false, without a throughput, so
+a sharder that loses data cannot post a fast time.
+
+Usage:
+  python3 bench_sharding.py --sizes 1M,64M,1G --shard-sizes 1M,16M --workers 1,4 --out bench.json
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+LINE_SHARDER = HERE / "26-01062026.py"
+GUIDE_30 = HERE / "30-01062026.md"
+SHARD_ENGINE = HERE / "35-10192026.py"
+
+MAX_FILE_SIZE = 50 << 30
+GEN_CHUNK = 8 << 20
+LINE_SHARDER_LIMIT = 1 << 30   # 26 reads whole "lines"; zero-filled files are one line
+AVG_LINE_BYTES = 80            # converts a byte shard size into 26's lines per shard
+
+DEFAULT_SIZES = "1M,64M,512M"
+DEFAULT_SHARD_SIZES = "1M,16M"
+DEFAULT_WORKERS = "1,4"
+
+
+def parse_size(text: str) -> int:
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([KMGT]?)B?", text.strip().upper())
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    mult = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}[m.group(2)]
+    return int(float(m.group(1)) * mult)
+
+
+def parse_list(conv):
+    return lambda text: [conv(part) for part in text.split(",") if part.strip()]
+
+
+# -----------------------------
+# Implementations under test
+# -----------------------------
+def load_script(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so worker processes can unpickle module-level functions
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_guide_functions(path: Path) -> dict:
+    """
+    Execute the definition blocks of the python examples in a markdown
+    guide (skipping usage snippets) and return the resulting namespace.
+    """
+    ns = {"__name__": "guide_30"}
+    for block in re.findall(r"```python\n(.*?)```", path.read_text(), re.S):
+        if block.lstrip().startswith(("from ", "import ", "def ")):
+            exec(compile(block, str(path), "exec"), ns)
+    return ns
+
+
+def load_impls() -> dict:
+    """
+    Load every implementation up front so import and exec time stays out
+    of the measured interval.
+    """
+    return {
+        "26": load_script("shard_demo", LINE_SHARDER),
+        "30": load_guide_functions(GUIDE_30),
+        "35": load_script("shard_engine", SHARD_ENGINE),
+    }
+
+
+def case_shard_26(impls, case):
+    mod = impls["26"]
+    mod.LINES_PER_SHARD = max(1, case["shard_size"] // AVG_LINE_BYTES)
+    mod.shard_file(Path(case["src"]), Path(case["out"]))
+
+
+def case_reassemble_26(impls, case):
+    impls["26"].reassemble(Path(case["shards"]), Path(case["out"]))
+
+
+def case_shard_30(impls, case):
+    impls["30"]["shard_file_with_hashes"](Path(case["src"]), Path(case["out"]), case["shard_size"])
+
+
+def case_verify_30(impls, case):
+    impls["30"]["verify_and_reassemble"](Path(case["shards"]), Path(case["out"]))
+
+
+def case_shard_35(impls, case):
+    impls["35"].shard_byte_ranges(
+        Path(case["src"]), Path(case["out"]), case["shard_size"],
+        with_hashes=case.get("hash", False),
+        codec=case.get("codec"),
+        workers=case.get("workers", 1),
+    )
+
+
+def case_reassemble_35(impls, case):
+    impls["35"].parallel_reassemble(Path(case["shards"]), Path(case["out"]), case.get("workers", 1))
+
+
+CASES = {
+    "shard/26": case_shard_26,
+    "reassemble/26": case_reassemble_26,
+    "shard/30": case_shard_30,
+    "verify/30": case_verify_30,
+    "shard/35": case_shard_35,
+    "reassemble/35": case_reassemble_35,
+}
+
+
+# -----------------------------
+# Measurement (child side)
+# -----------------------------
+def read_proc_io() -> dict:
+    stats = {}
+    try:
+        for line in Path("/proc/self/io").read_text().splitlines():
+            key, value = line.split(":", 1)
+            stats[key] = int(value)
+    except (FileNotFoundError, PermissionError, ValueError):
+        pass
+    return stats
+
+
+def count_calls(names: tuple[str, ...]) -> dict:
+    """Wrap the named os functions so each call is counted in the returned dict."""
+    counts = {}
+    for name in names:
+        func = getattr(os, name, None)
+        if func is None:
+            continue
+        counts[name] = 0
+
+        def counted(*args, _func=func, _name=name):
+            counts[_name] += 1
+            return _func(*args)
+
+        setattr(os, name, counted)
+    return counts
+
+
+def run_case(case: dict) -> dict:
+    impls = load_impls()
+    calls = count_calls(("copy_file_range", "sendfile"))
+    before = read_proc_io()
+    t0 = time.perf_counter()
+    CASES[case["op"]](impls, case)
+    elapsed = time.perf_counter() - t0
+    after = read_proc_io()
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    rss_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    rss_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+
+    delta = {k: after[k] - before.get(k, 0) for k in after}
+    return {
+        "elapsed_s": round(elapsed, 6),
+        "read_syscalls": delta.get("syscr"),
+        "write_syscalls": delta.get("syscw"),
+        "copy_file_range_calls": calls.get("copy_file_range"),
+        "sendfile_calls": calls.get("sendfile"),
+        "read_bytes": delta.get("read_bytes"),
+        "write_bytes": delta.get("write_bytes"),
+        "peak_rss_bytes": rss_self,
+        "peak_rss_children_bytes": rss_children,
+    }
+
+
+# -----------------------------
+# Orchestration (parent side)
+# -----------------------------
+def generate_file(path: Path, size: int, kind: str) -> None:
+    if path.exists() and path.stat().st_size == size:
+        return
+    with path.open("wb") as f:
+        if kind == "sparse":
+            f.truncate(size)
+            return
+        remaining = size
+        while remaining:
+            n = min(GEN_CHUNK, remaining)
+            f.write(os.urandom(n))
+            remaining -= n
+
+
+def file_sha256(path: Path) -> str | None:
+    try:
+        with path.open("rb") as f:
+            h = hashlib.sha256()
+            while chunk := f.read(GEN_CHUNK):
+                h.update(chunk)
+            return h.hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def drop_caches() -> None:
+    os.sync()
+    try:
+        Path("/proc/sys/vm/drop_caches").write_text("3\n")
+    except OSError as e:
+        print(f"[!] Could not drop page cache ({e}); results include cached reads")
+
+
+def spawn_case(case: dict, file_size: int, cold: bool) -> dict:
+    if cold:
+        drop_caches()
+
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--case", json.dumps(case)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    result = {k: v for k, v in case.items() if k not in ("src", "out", "shards", "expect_sha256")}
+    result["file_size"] = file_size
+    if proc.returncode != 0:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+        return result
+
+    result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    if "expect_sha256" in case:
+        result["verified"] = file_sha256(Path(case["out"])) == case["expect_sha256"]
+        if not result["verified"]:
+            result["mb_per_s"] = None
+            return result
+    elapsed = result["elapsed_s"]
+    result["mb_per_s"] = round(file_size / (1 << 20) / elapsed, 2) if elapsed else None
+    return result
+
+
+def plan_cases(src: Path, src_sha256: str, work: Path, file_size: int, shard_size: int, workers: list[int]):
+    """
+    Yield cases in dependency order: each reassembly case
+    reads the shard directory produced by the matching shard case,
+    and its output is checked against `src_sha256`.
+    """
+    d = lambda name: str(work / f"{name}-{shard_size}")
+    out = str(work / "reassembled.bin")
+
+    if file_size <= LINE_SHARDER_LIMIT:
+        yield {"op": "shard/26", "src": str(src), "out": d("s26"), "shard_size": shard_size}
+        yield {"op": "reassemble/26", "shards": d("s26"), "out": out, "shard_size": shard_size,
+               "expect_sha256": src_sha256}
+
+    yield {"op": "shard/30", "src": str(src), "out": d("s30"), "shard_size": shard_size}
+    yield {"op": "verify/30", "shards": d("s30"), "out": out, "shard_size": shard_size,
+           "expect_sha256": src_sha256}
+
+    yield {"op": "shard/35", "src": str(src), "out": d("s35"), "shard_size": shard_size}
+    yield {"op": "shard/35", "src": str(src), "out": d("s35h"), "shard_size": shard_size,
+           "hash": True, "variant": "hash"}
+    for n in workers:
+        yield {"op": "reassemble/35", "shards": d("s35h"), "out": out, "shard_size": shard_size,
+               "variant": "hash", "workers": n, "expect_sha256": src_sha256}
+    for n in workers:
+        yield {"op": "shard/35", "src": str(src), "out": d("s35z"), "shard_size": shard_size,
+               "codec": "zlib", "variant": "zlib", "workers": n}
+    for n in workers:
+        yield {"op": "reassemble/35", "shards": d("s35z"), "out": out, "shard_size": shard_size,
+               "variant": "zlib", "workers": n, "expect_sha256": src_sha256}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark sharding, verification and reassembly.")
+    ap.add_argument("--sizes", type=parse_list(parse_size), default=parse_list(parse_size)(DEFAULT_SIZES),
+                    help=f"Test file sizes, 1M..50G (default: {DEFAULT_SIZES})")
+    ap.add_argument("--kinds", type=parse_list(str), default=["sparse", "random"],
+                    help="File kinds: sparse,random (default: both)")
+    ap.add_argument("--shard-sizes", type=parse_list(parse_size), default=parse_list(parse_size)(DEFAULT_SHARD_SIZES),
+                    help=f"Shard sizes (default: {DEFAULT_SHARD_SIZES})")
+    ap.add_argument("--workers", type=parse_list(int), default=parse_list(int)(DEFAULT_WORKERS),
+                    help=f"Worker counts for parallel cases (default: {DEFAULT_WORKERS})")
+    ap.add_argument("--workdir", type=Path, default=Path("bench-work"),
+                    help="Scratch directory for test files and shards")
+    ap.add_argument("--out", type=Path, default=Path("bench_results.json"), help="JSON results file")
+    ap.add_argument("--cold", action="store_true", help="Drop the page cache before each case (root)")
+    ap.add_argument("--keep-files", action="store_true", help="Keep generated test files")
+    ap.add_argument("--case", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    for size in args.sizes:
+        if not 0 < size <= MAX_FILE_SIZE:
+            raise SystemExit(f"File sizes must be between 1 byte and 50G: {size}")
+    for kind in args.kinds:
+        if kind not in ("sparse", "random"):
+            raise SystemExit(f"Unknown file kind: {kind}")
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    results = []
+
+    try:
+        for kind in args.kinds:
+            for size in args.sizes:
+                src = args.workdir / f"{kind}-{size}.bin"
+                print(f"[*] Generating {kind} file of {size} bytes")
+                generate_file(src, size, kind)
+                src_sha256 = file_sha256(src)
+
+                for shard_size in args.shard_sizes:
+                    dirs = set()
+                    for case in plan_cases(src, src_sha256, args.workdir, size, shard_size, args.workers):
+                        res = spawn_case(case, size, args.cold)
+                        res["kind"] = kind
+                        results.append(res)
+                        dirs.add(case.get("out"))
+                        print(
+                            f"    {case['op']:<14} {case.get('variant', ''):<5} shard={shard_size:<10} workers={case.get('workers', 1):<3} "
+                            + (f"ERROR {res['error']}" if "error" in res else
+                               "OUTPUT DIFFERS FROM SOURCE" if res.get("verified") is False else
+                               f"{res['mb_per_s']:>9} MB/s  rss={res['peak_rss_bytes'] >> 20} MB")
+                        )
+                    for path in dirs:
+                        p = Path(path)
+                        if p.is_dir():
+                            shutil.rmtree(p)
+                        elif p.exists():
+                            p.unlink()
+
+                if not args.keep_files:
+                    src.unlink()
+    finally:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().astimezone().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "cold_cache": args.cold,
+            },
+            "results": results,
+            "unverified": sum(1 for r in results if r.get("verified") is False),
+        }
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"[✓] Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
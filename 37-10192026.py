@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Local scan results database for the nmap wrappers (08, 09).
+
+- import: load -oA XML outputs (scan.xml) into SQLite, indexed by
+  host, port and scan time; already-imported files are skipped
+- list:   show imported scans
+- diff:   report opened/closed ports and service/version changes
+          between any two scans
+
+Usage:
+  python3 scan_db.py import nmap_*/scan.xml nmap_syn_*/
+  python3 scan_db.py list
+  python3 scan_db.py diff 12 31
+  python3 scan_db.py diff previous latest --host 192.168.1.10
+"""
+
+from __future__ import annotations
+import argparse
+import sqlite3
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+
+DB_PATH = Path("scans.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id       INTEGER PRIMARY KEY,
+    source   TEXT NOT NULL UNIQUE,
+    args     TEXT,
+    started  INTEGER,
+    finished INTEGER
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    host    TEXT NOT NULL,
+    status  TEXT,
+    PRIMARY KEY (scan_id, host)
+);
+CREATE TABLE IF NOT EXISTS ports (
+    scan_id  INTEGER NOT NULL REFERENCES scans(id),
+    host     TEXT NOT NULL,
+    protocol TEXT NOT NULL,
+    port     INTEGER NOT NULL,
+    state    TEXT,
+    service  TEXT,
+    product  TEXT,
+    version  TEXT,
+    PRIMARY KEY (scan_id, host, protocol, port)
+);
+CREATE INDEX IF NOT EXISTS idx_scans_started ON scans(started);
+CREATE INDEX IF NOT EXISTS idx_ports_host_port ON ports(host, port, scan_id);
+"""
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_scan_files(paths: list[Path]):
+    """
+    Yield XML files from the given paths; directories are searched for
+    the scan.xml written by `nmap -oA <dir>/scan`.
+    """
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.rglob("*.xml"))
+        elif path.is_file():
+            yield path
+        else:
+            print(f"[!] Not found: {path}")
+
+
+def parse_scan(xml_path: Path):
+    """
+    Stream one nmap XML file. Returns (scan info, hosts, ports) where
+    hosts are (host, status) and ports are
+    (host, protocol, port, state, service, product, version).
+    """
+    info = {"args": None, "started": None, "finished": None}
+    hosts = []
+    ports = []
+
+    root = None
+    for event, elem in ET.iterparse(xml_path, events=("start", "end")):
+        if root is None:
+            root = elem
+            info["args"] = elem.get("args")
+            info["started"] = int(elem.get("start", 0)) or None
+            continue
+        if event != "end":
+            continue
+
+        if elem.tag == "finished":
+            info["finished"] = int(elem.get("time", 0)) or None
+
+        elif elem.tag == "host":
+            addr = None
+            for a in elem.findall("address"):
+                if a.get("addrtype") in ("ipv4", "ipv6"):
+                    addr = a.get("addr")
+                    break
+            if addr:
+                status = elem.find("status")
+                hosts.append((addr, status.get("state") if status is not None else None))
+                for p in elem.iterfind("ports/port"):
+                    state = p.find("state")
+                    svc = p.find("service")
+                    ports.append((
+                        addr,
+                        p.get("protocol"),
+                        int(p.get("portid")),
+                        state.get("state") if state is not None else None,
+                        svc.get("name") if svc is not None else None,
+                        svc.get("product") if svc is not None else None,
+                        svc.get("version") if svc is not None else None,
+                    ))
+            root.clear()
+
+    return info, hosts, ports
+
+
+def import_scans(conn: sqlite3.Connection, paths: list[Path]) -> int:
+    imported = 0
+    for xml_path in iter_scan_files(paths):
+        source = str(xml_path.resolve())
+        if conn.execute("SELECT 1 FROM scans WHERE source = ?", (source,)).fetchone():
+            continue
+
+        try:
+            info, hosts, ports = parse_scan(xml_path)
+        except ET.ParseError as e:
+            # Interrupted scans leave truncated XML behind
+            print(f"[!] Skipping {xml_path}: {e}")
+            continue
+
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO scans (source, args, started, finished) VALUES (?, ?, ?, ?)",
+                (source, info["args"], info["started"], info["finished"]),
+            )
+            scan_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR REPLACE INTO hosts VALUES (?, ?, ?)",
+                [(scan_id, *h) for h in hosts],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO ports VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(scan_id, *p) for p in ports],
+            )
+
+        imported += 1
+        print(f"[+] Imported scan {scan_id}: {xml_path} ({len(hosts)} hosts, {len(ports)} ports)")
+
+    return imported
+
+
+def resolve_scan(conn: sqlite3.Connection, spec: str) -> int:
+    """
+    Accept a scan id, 'latest' or 'previous' (second most recent).
+    """
+    if spec.isdigit():
+        row = conn.execute("SELECT id FROM scans WHERE id = ?", (int(spec),)).fetchone()
+    elif spec in ("latest", "previous"):
+        offset = 0 if spec == "latest" else 1
+        row = conn.execute(
+            "SELECT id FROM scans ORDER BY started DESC, id DESC LIMIT 1 OFFSET ?", (offset,)
+        ).fetchone()
+    else:
+        raise SystemExit(f"Invalid scan reference: {spec} (use an id, 'latest' or 'previous')")
+
+    if not row:
+        raise SystemExit(f"No such scan: {spec}")
+    return row[0]
+
+
+def load_ports(conn: sqlite3.Connection, scan_id: int, host: str | None) -> dict:
+    query = "SELECT host, protocol, port, state, service, product, version FROM ports WHERE scan_id = ?"
+    params = [scan_id]
+    if host:
+        query += " AND host = ?"
+        params.append(host)
+    return {(r[0], r[1], r[2]): r[3:] for r in conn.execute(query, params)}
+
+
+def load_hosts(conn: sqlite3.Connection, scan_id: int, host: str | None) -> set:
+    query = "SELECT host FROM hosts WHERE scan_id = ?"
+    params = [scan_id]
+    if host:
+        query += " AND host = ?"
+        params.append(host)
+    return {r[0] for r in conn.execute(query, params)}
+
+
+def diff_scans(conn: sqlite3.Connection, old_id: int, new_id: int, host: str | None = None) -> list[str]:
+    """
+    Compare two scans. Only hosts present in both are compared port by
+    port; hosts seen in just one scan are reported separately.
+    """
+    old_hosts = load_hosts(conn, old_id, host)
+    new_hosts = load_hosts(conn, new_id, host)
+    old = load_ports(conn, old_id, host)
+    new = load_ports(conn, new_id, host)
+
+    lines = []
+    for h in sorted(new_hosts - old_hosts):
+        lines.append(f"+ host {h} (only in scan {new_id})")
+    for h in sorted(old_hosts - new_hosts):
+        lines.append(f"- host {h} (only in scan {old_id})")
+
+    common = old_hosts & new_hosts
+    for key in sorted(set(old) | set(new)):
+        h, proto, port = key
+        if h not in common:
+            continue
+
+        before = old.get(key)
+        after = new.get(key)
+        was_open = before is not None and before[0] == "open"
+        is_open = after is not None and after[0] == "open"
+        label = f"{h} {port}/{proto}"
+
+        if is_open and not was_open:
+            lines.append(f"+ opened  {label} {describe(after)}")
+        elif was_open and not is_open:
+            lines.append(f"- closed  {label} {describe(before)}")
+        elif was_open and is_open and before[1:] != after[1:]:
+            lines.append(f"~ changed {label} {describe(before)} -> {describe(after)}")
+
+    return lines
+
+
+def describe(row) -> str:
+    _, service, product, version = row
+    return " ".join(x for x in (service, product, version) if x) or "unknown"
+
+
+def fmt_time(ts) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "?"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Import nmap XML results into SQLite and diff scans.")
+    ap.add_argument("--db", type=Path, default=DB_PATH, help=f"SQLite database (default: {DB_PATH})")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    ip = sub.add_parser("import", help="Import nmap XML files or scan directories")
+    ip.add_argument("paths", nargs="+", type=Path)
+
+    sub.add_parser("list", help="List imported scans")
+
+    dp = sub.add_parser("diff", help="Show changes between two scans")
+    dp.add_argument("old", help="Older scan id, or 'previous'")
+    dp.add_argument("new", help="Newer scan id, or 'latest'")
+    dp.add_argument("--host", help="Only compare this host")
+
+    args = ap.parse_args()
+    conn = connect(args.db)
+
+    try:
+        if args.command == "import":
+            n = import_scans(conn, args.paths)
+            print(f"[✓] Imported {n} new scan(s) into {args.db}")
+
+        elif args.command == "list":
+            rows = conn.execute(
+                "SELECT s.id, s.started, COUNT(h.host), s.args FROM scans s "
+                "LEFT JOIN hosts h ON h.scan_id = s.id GROUP BY s.id ORDER BY s.started, s.id"
+            )
+            for scan_id, started, n_hosts, scan_args in rows:
+                print(f"{scan_id:>5}  {fmt_time(started)}  {n_hosts:>5} hosts  {scan_args or ''}")
+
+        elif args.command == "diff":
+            old_id = resolve_scan(conn, args.old)
+            new_id = resolve_scan(conn, args.new)
+            lines = diff_scans(conn, old_id, new_id, args.host)
+            print(f"Scan {old_id} -> {new_id}: {len(lines)} change(s)")
+            for line in lines:
+                print(line)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
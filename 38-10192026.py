@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Service/version fingerprinting for collected banners.
+
+Classifies the JSON lines written by the banner tools:
+- 11 --batch:   {"host", "port", "banner", "banner_b64", ...}
+- 13 --targets: {"host", "port", "headers", "server", ...}
+
+Signatures are regexes with version-capture templates ($1..$9), loaded
+from a JSON file or from nmap-service-probes "match"/"softmatch" lines.
+They are compiled once and indexed by literal prefix and by port, so each
+banner is only tested against a small candidate set.
+
+Usage:
+  python3 fingerprint.py banners.jsonl
+  python3 fingerprint.py banners.jsonl --signatures /usr/share/nmap/nmap-service-probes
+  python3 fingerprint.py banners.jsonl --signatures sigs.json --stats
+"""
+
+from __future__ import annotations
+import argparse
+import base64
+import binascii
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable
+
+PREFIX_KEY_LEN = 3
+
+# Small built-in database; extend with --signatures.
+DEFAULT_SIGNATURES = [
+    {"service": "ftp", "pattern": r"^220[- ]ProFTPD (\d[\w.]+)", "product": "ProFTPD", "version": "$1", "ports": [21]},
+    {"service": "ftp", "pattern": r"^220 \(vsFTPd (\d[\w.]+)\)", "product": "vsftpd", "version": "$1", "ports": [21]},
+    {"service": "ftp", "pattern": r"^220[- ].*Pure-FTPd", "product": "Pure-FTPd", "ports": [21]},
+    {"service": "ftp", "pattern": r"^220[- ].*FileZilla Server(?: version)? ([\w.]+)", "product": "FileZilla ftpd", "version": "$1", "ports": [21]},
+    {"service": "ftp", "pattern": r"^220[- ]", "product": "", "ports": [21], "soft": True},
+    {"service": "ssh", "pattern": r"^SSH-([\d.]+)-OpenSSH_([\w.]+)(?:[ -](\S+))?", "product": "OpenSSH", "version": "$2", "info": "protocol $1; $3", "ports": [22]},
+    {"service": "ssh", "pattern": r"^SSH-([\d.]+)-dropbear_([\w.]+)", "product": "Dropbear sshd", "version": "$2", "info": "protocol $1", "ports": [22]},
+    {"service": "ssh", "pattern": r"^SSH-([\d.]+)-", "product": "", "info": "protocol $1", "ports": [22], "soft": True},
+    {"service": "smtp", "pattern": r"^220 ([\w.-]+) ESMTP Postfix", "product": "Postfix smtpd", "info": "host $1", "ports": [25, 587]},
+    {"service": "smtp", "pattern": r"^220 ([\w.-]+) ESMTP Exim (\d[\w.]+)", "product": "Exim smtpd", "version": "$2", "info": "host $1", "ports": [25, 587]},
+    {"service": "smtp", "pattern": r"^220 ([\w.-]+) ESMTP Sendmail ([\w./]+)", "product": "Sendmail", "version": "$2", "info": "host $1", "ports": [25, 587]},
+    {"service": "smtp", "pattern": r"^220[- ][\w.-]+ .*SMTP", "product": "", "ports": [25, 587], "soft": True},
+    {"service": "pop3", "pattern": r"^\+OK Dovecot", "product": "Dovecot pop3d", "ports": [110]},
+    {"service": "imap", "pattern": r"^\* OK .*Dovecot", "product": "Dovecot imapd", "ports": [143]},
+    {"service": "mysql", "pattern": r"^.\x00\x00\x00\x0a(\d[\w.-]+)\x00", "flags": "s", "product": "MySQL", "version": "$1", "ports": [3306]},
+    {"service": "redis", "pattern": r"^-ERR unknown command", "product": "Redis key-value store", "ports": [6379]},
+    {"service": "vnc", "pattern": r"^RFB (\d{3}\.\d{3})\n", "product": "VNC", "info": "protocol $1", "ports": [5900]},
+    {"service": "telnet", "pattern": r"^\xff[\xfb-\xfe]", "flags": "s", "product": "", "ports": [23], "soft": True},
+    {"service": "http", "pattern": r"^Server: Apache/([\d.]+)(?: \(([^)]+)\))?", "flags": "m", "product": "Apache httpd", "version": "$1", "info": "$2", "ports": [80, 443, 8080]},
+    {"service": "http", "pattern": r"^Server: nginx/([\d.]+)", "flags": "m", "product": "nginx", "version": "$1", "ports": [80, 443, 8080]},
+    {"service": "http", "pattern": r"^Server: Microsoft-IIS/([\d.]+)", "flags": "m", "product": "Microsoft IIS httpd", "version": "$1", "ports": [80, 443]},
+    {"service": "http", "pattern": r"^Server: lighttpd/([\d.]+)", "flags": "m", "product": "lighttpd", "version": "$1", "ports": [80, 443]},
+    {"service": "http", "pattern": r"^Server: SimpleHTTP/([\d.]+) Python/([\d.]+)", "flags": "m", "product": "SimpleHTTPServer", "version": "$1", "info": "Python $2", "ports": [8000, 8080]},
+    {"service": "http", "pattern": r"^HTTP/1\.[01] \d\d\d", "product": "", "ports": [80, 443, 8080], "soft": True},
+]
+
+NMAP_MATCH_RE = re.compile(r"^(match|softmatch)\s+(\S+)\s+m(.)")
+NMAP_FIELD_RE = re.compile(r"\s+([pvihod]|cpe:)([/|])(.*?)\2([a]?)")
+
+
+class Signature:
+    __slots__ = ("service", "regex", "match", "product", "version", "info", "ports", "soft", "order")
+
+    def __init__(self, service, regex, product="", version="", info="", ports=(), soft=False, order=0):
+        self.service = service
+        self.regex = regex
+        # ^ only pins re.match to the start when MULTILINE is off
+        anchored = regex.pattern.startswith("^") and not regex.flags & re.MULTILINE
+        self.match = regex.match if anchored else regex.search
+        self.product = product
+        self.version = version
+        self.info = info
+        self.ports = frozenset(ports)
+        self.soft = soft
+        self.order = order
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def compile_flags(flags: str) -> int:
+    value = 0
+    if "i" in flags:
+        value |= re.IGNORECASE
+    if "s" in flags:
+        value |= re.DOTALL
+    if "m" in flags:
+        value |= re.MULTILINE
+    return value
+
+
+def load_json_signatures(entries: list[dict]) -> tuple[list[tuple], int]:
+    sigs, bad = [], 0
+    for e in entries:
+        try:
+            regex = re.compile(e["pattern"], compile_flags(e.get("flags", "")))
+        except (re.error, KeyError):
+            bad += 1
+            continue
+        sigs.append((e["service"], regex, e.get("product", ""), e.get("version", ""),
+                     e.get("info", ""), e.get("ports", ()), e.get("soft", False)))
+    return sigs, bad
+
+
+def parse_port_spec(spec: str) -> list[int]:
+    ports = []
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            if lo.isdigit() and hi.isdigit() and int(hi) - int(lo) <= 1024:
+                ports.extend(range(int(lo), int(hi) + 1))
+        elif part.isdigit():
+            ports.append(int(part))
+    return ports
+
+
+def load_nmap_probes(path: Path) -> tuple[list[tuple], int]:
+    """
+    Load match/softmatch lines from an nmap-service-probes file. Port
+    hints come from the enclosing Probe's "ports" directive. Patterns
+    Python's re cannot compile are skipped and counted.
+    """
+    sigs, bad = [], 0
+    ports: list[int] = []
+
+    for line in path.read_text(encoding="latin-1").splitlines():
+        if line.startswith("Probe "):
+            ports = []
+            continue
+        if line.startswith("ports "):
+            ports = parse_port_spec(line[6:])
+            continue
+
+        m = NMAP_MATCH_RE.match(line)
+        if not m:
+            continue
+        kind, service, delim = m.groups()
+        rest = line[m.end():]
+        end = rest.find(delim)
+        if end < 0:
+            bad += 1
+            continue
+        pattern, rest = rest[:end], rest[end + 1:]
+        flags = ""
+        while rest and rest[0] in "is":
+            flags, rest = flags + rest[0], rest[1:]
+
+        fields = {k: v for k, _, v, _ in NMAP_FIELD_RE.findall(rest)}
+        try:
+            regex = re.compile(pattern, compile_flags(flags))
+        except (re.error, OverflowError):
+            bad += 1
+            continue
+        sigs.append((service, regex, fields.get("p", ""), fields.get("v", ""),
+                     fields.get("i", ""), ports, kind == "softmatch"))
+
+    return sigs, bad
+
+
+def load_signatures(paths: Iterable[Path], include_defaults: bool = True) -> tuple[list[Signature], int]:
+    raw, bad = [], 0
+    if include_defaults:
+        raw, bad = load_json_signatures(DEFAULT_SIGNATURES)
+
+    for path in paths:
+        text = path.read_text(encoding="latin-1")
+        if text.lstrip().startswith(("[", "{")):
+            data = json.loads(text)
+            more, n_bad = load_json_signatures(data["signatures"] if isinstance(data, dict) else data)
+        else:
+            more, n_bad = load_nmap_probes(path)
+        raw.extend(more)
+        bad += n_bad
+
+    return [Signature(*r, order=i) for i, r in enumerate(raw)], bad
+
+
+# -----------------------------
+# Indexing
+# -----------------------------
+ESCAPES = {"r": "\r", "n": "\n", "t": "\t", "0": "\0", "f": "\f", "v": "\v", "a": "\a", "e": "\x1b"}
+
+
+def has_top_level_alternation(pattern: str) -> bool:
+    depth, i, in_class = 0, 0, False
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+            if pattern[i + 1:i + 2] == "]":
+                i += 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def anchored_literal(regex: re.Pattern) -> str:
+    """
+    Return the literal text that follows the pattern's leading ^, or "" if
+    it is unanchored, alternates at top level or starts with a class.
+    """
+    pattern = regex.pattern
+    if not pattern.startswith("^") or has_top_level_alternation(pattern):
+        return ""
+
+    out = []
+    i = 1
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            n = pattern[i + 1]
+            if n in ESCAPES:
+                ch, step = ESCAPES[n], 2
+            elif n == "x" and re.fullmatch(r"[0-9a-fA-F]{2}", pattern[i + 2:i + 4]):
+                ch, step = chr(int(pattern[i + 2:i + 4], 16)), 4
+            elif not n.isalnum():
+                ch, step = n, 2
+            else:
+                break
+        elif c in ".^$*+?{}[]()|":
+            break
+        else:
+            ch, step = c, 1
+
+        # A quantifier makes the previous literal optional or repeated
+        if pattern[i + step:i + step + 1] in ("*", "?", "{"):
+            break
+        out.append(ch)
+        i += step
+        if pattern[i - 1:i] == "+" or len(out) >= PREFIX_KEY_LEN:
+            break
+
+    prefix = "".join(out)
+    return prefix.lower() if regex.flags & re.IGNORECASE else prefix
+
+
+def literal_prefix(regex: re.Pattern) -> str:
+    """The literal text every match must start the banner with, or ""."""
+    return "" if regex.flags & re.MULTILINE else anchored_literal(regex)
+
+
+def line_prefix(regex: re.Pattern) -> str:
+    """For a MULTILINE ^pattern, the literal some line must start with, or ""."""
+    return anchored_literal(regex) if regex.flags & re.MULTILINE else ""
+
+
+def line_heads(banner: str) -> frozenset[str]:
+    """First PREFIX_KEY_LEN characters of every line, where MULTILINE ^ can match."""
+    return frozenset(line[:PREFIX_KEY_LEN] for line in banner.split("\n"))
+
+
+class SignatureIndex:
+    """
+    Signatures bucketed by literal prefix (exact and case-insensitive
+    buckets, keyed by up to PREFIX_KEY_LEN characters). MULTILINE ^patterns
+    such as "^Server: " are bucketed the same way by the literal a line
+    must start with. Signatures without a usable prefix are tried for
+    every banner. The port hint only orders candidates; it never rules
+    one out.
+    """
+
+    def __init__(self, signatures: list[Signature]):
+        self.by_prefix = [defaultdict(list) for _ in range(PREFIX_KEY_LEN + 1)]
+        self.by_prefix_ci = [defaultdict(list) for _ in range(PREFIX_KEY_LEN + 1)]
+        self.by_line = [defaultdict(list) for _ in range(PREFIX_KEY_LEN + 1)]
+        self.by_line_ci = [defaultdict(list) for _ in range(PREFIX_KEY_LEN + 1)]
+        self.unprefixed = []
+        self.size = len(signatures)
+
+        for sig in signatures:
+            ci = sig.regex.flags & re.IGNORECASE
+            prefix = literal_prefix(sig.regex)
+            line = line_prefix(sig.regex)
+            if prefix:
+                table = self.by_prefix_ci if ci else self.by_prefix
+                table[len(prefix)][prefix].append(sig)
+            elif line:
+                table = self.by_line_ci if ci else self.by_line
+                table[len(line)][line].append(sig)
+            else:
+                self.unprefixed.append(sig)
+
+        self._has_lines = any(self.by_line) or any(self.by_line_ci)
+        self._cache = {}
+
+    def candidates(self, banner: str, port: int | None) -> list[Signature]:
+        head = banner[:PREFIX_KEY_LEN]
+        heads = line_heads(banner) if self._has_lines else frozenset()
+        key = (head, heads, port)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        head_ci = head.lower()
+        found = []
+        for n in range(1, PREFIX_KEY_LEN + 1):
+            found.extend(self.by_prefix[n].get(head[:n], ()))
+            found.extend(self.by_prefix_ci[n].get(head_ci[:n], ()))
+            for line in heads:
+                found.extend(self.by_line[n].get(line[:n], ()))
+                found.extend(self.by_line_ci[n].get(line[:n].lower(), ()))
+        found.extend(self.unprefixed)
+
+        # Several lines can share a short key; port-hinted signatures
+        # first, then database order
+        found = sorted({s.order: s for s in found}.values(), key=lambda s: (port not in s.ports, s.order))
+        if len(self._cache) < 100_000:
+            self._cache[key] = found
+        return found
+
+
+# -----------------------------
+# Matching
+# -----------------------------
+TEMPLATE_RE = re.compile(r"\$(\d)|\$P\((\d)\)")
+
+
+def expand(template: str, m: re.Match) -> str:
+    def sub(t):
+        idx = int(t.group(1) or t.group(2))
+        try:
+            value = m.group(idx) or ""
+        except IndexError:
+            return ""
+        if t.group(2):
+            value = "".join(c for c in value if c.isprintable())
+        return value
+    return TEMPLATE_RE.sub(sub, template).strip(" ;")
+
+
+def classify(index: SignatureIndex, banner: str, port: int | None) -> dict | None:
+    """
+    First hard match wins; a softmatch is returned only if no hard
+    signature matches.
+    """
+    soft = None
+    for sig in index.candidates(banner, port):
+        if soft is not None and sig.soft:
+            continue
+        m = sig.match(banner)
+        if not m:
+            continue
+        result = {
+            "service": sig.service,
+            "product": expand(sig.product, m) or None,
+            "version": expand(sig.version, m) or None,
+            "info": expand(sig.info, m) or None,
+            "soft": sig.soft,
+        }
+        if not sig.soft:
+            return result
+        soft = result
+    return soft
+
+
+def banner_of(record: dict) -> str | None:
+    """
+    Banner text from an 11 record, or a header block from a 13 record.
+
+    11's raw bytes are decoded as latin-1, one code point per byte, so
+    byte-level patterns such as \xff match the bytes the service sent.
+    """
+    if record.get("banner_b64"):
+        try:
+            return base64.b64decode(record["banner_b64"], validate=True).decode("latin-1")
+        except (binascii.Error, ValueError):
+            pass
+    if record.get("banner"):
+        return record["banner"]
+    headers = record.get("headers")
+    if headers:
+        status = f"HTTP/1.1 {record.get('status')} {record.get('reason') or ''}".rstrip()
+        return status + "\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers)
+    return None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Classify banners against a signature database.")
+    ap.add_argument("input", type=Path, nargs="?", help="JSON lines from 11 --batch or 13 --targets (default: stdin)")
+    ap.add_argument("--signatures", type=Path, action="append", default=[],
+                    help="Signature file: JSON list or nmap-service-probes (repeatable)")
+    ap.add_argument("--no-defaults", action="store_true", help="Do not load the built-in signatures")
+    ap.add_argument("--stats", action="store_true", help="Print index and throughput stats to stderr")
+    args = ap.parse_args()
+
+    sigs, bad = load_signatures(args.signatures, include_defaults=not args.no_defaults)
+    index = SignatureIndex(sigs)
+    if args.stats:
+        print(f"[*] {index.size} signatures ({bad} skipped), {len(index.unprefixed)} unindexed",
+              file=sys.stderr)
+
+    src = args.input.open() if args.input else sys.stdin
+    n = 0
+    t0 = time.perf_counter()
+    try:
+        for line in src:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            banner = banner_of(record)
+            record["match"] = classify(index, banner, record.get("port")) if banner else None
+            print(json.dumps(record))
+            n += 1
+    finally:
+        if src is not sys.stdin:
+            src.close()
+
+    if args.stats:
+        elapsed = time.perf_counter() - t0
+        print(f"[*] Classified {n} banners in {elapsed:.2f}s ({n / elapsed if elapsed else 0:.0f}/s)",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main() or 0)
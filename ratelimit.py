@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Token bucket shared by the scanners (25's asyncio probe, 14's thread pool).
+
+Running this file checks the bucket against a fake clock.
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    At most `rate` acquisitions per second, with bursts of up to one
+    second's worth and never less than one token, so a rate below 1/s
+    still hands out a token every 1/rate seconds.
+
+    acquire() blocks the calling thread, acquire_async() only the calling
+    task; both may be used on the same bucket.
+    """
+
+    def __init__(self, rate, clock=time.monotonic):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate!r}")
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token and return 0, or return the seconds until one is due."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while delay := self.try_acquire():
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        while delay := self.try_acquire():
+            await asyncio.sleep(delay)
+
+
+def _check():
+    now = [0.0]
+    for rate in (0.25, 0.5, 1, 3.5, 100):
+        now[0] = 0.0
+        bucket = TokenBucket(rate, clock=lambda: now[0])
+        burst = 0
+        while bucket.try_acquire() == 0:
+            burst += 1
+        assert burst == max(1, int(rate)), (rate, burst)
+        delay = bucket.try_acquire()
+        assert 0 < delay <= 1 / rate + 1e-9, (rate, delay)
+        now[0] += delay
+        assert bucket.try_acquire() == 0, rate
+    for rate in (0, -1):
+        try:
+            TokenBucket(rate)
+        except ValueError:
+            continue
+        raise AssertionError(rate)
+    print("ok")
+
+
+if __name__ == "__main__":
+    _check()